@@ -1,17 +1,63 @@
+import time
+from contextlib import nullcontext
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Union
 
-import pandas as pd
-import pdfplumber
 import streamlit as st
 
-from excel_writer.retail import RetailExcelWriter
-from excel_writer.wholesale import WholesaleExcelWriter
-from pdf_parser.retail_parser import RetailPOParser
-from pdf_parser.sk_parser import SKPOParser
-from pdf_parser.wholesale_parser import WholesalePOParser
+# Only light modules are imported up front so a cold instance renders the page
+# quickly; pandas, pdfplumber, openpyxl and the parsers load on the first run
+# (pipeline.ingest imports them lazily, batch/job are imported on "Run!").
+from excel_writer.formats import OUTPUT_FORMATS
+from pipeline.archive import count_uploaded_pdfs, iter_uploaded_pdfs
+from pipeline.cache import ExtractionCache
+from pipeline.ingest import (
+    AUTO_MODE,
+    DEFAULT_EXTRACTORS,
+    EARLY_STOP_MODES,
+    EXTRACTORS,
+    MODES,
+    create_excel_writer,
+    default_workers,
+    process_files,
+)
+from pipeline.memo import MemoCache, frame_digest
+from pipeline.memory import DEFAULT_DOC_MEMORY_MB
+from pipeline.pool import DEFAULT_PREWARM_WORKERS, WorkerPool
+from pipeline.startup import STARTUP
+from pipeline.store import DEFAULT_STORE_PATH, RecordStore
+from pipeline.timing import RunProfiler, StageTimer
+
+if TYPE_CHECKING:
+    from pipeline.batch import BatchCollector, MixedBatchCollector
+
+
+@st.cache_resource
+def shared_memo() -> MemoCache:
+    """
+    Parse results and serialized reports, shared by every session of this
+    server, so reruns and repeated uploads only process what changed.
+    """
+    return MemoCache()
+
+
+@st.cache_resource
+def worker_pool() -> Optional[WorkerPool]:
+    """Pre-warmed workers shared by every session, if PDF2EXCEL_PREWARM_WORKERS is set."""
+    if DEFAULT_PREWARM_WORKERS <= 0:
+        return None
+    return WorkerPool(DEFAULT_PREWARM_WORKERS)
+
+
+@st.cache_resource
+def record_store() -> RecordStore:
+    """The record store, opened once and shared by every session and its jobs."""
+    return RecordStore()
+
 
 # -------------------- Streamlit App --------------------
 st.set_page_config(layout="centered")  # default
+memo = shared_memo()
 
 st.markdown(
     """
@@ -32,147 +78,247 @@ st.subheader("Purchase Order PDF Parser → Excel")
 
 mode = st.radio(
     "Select order type:",
-    options=["Wholesale", "Retail", "SK"],
+    options=MODES + [AUTO_MODE],
+    format_func=lambda m: "Auto-detect (mixed upload)" if m == AUTO_MODE else m,
     horizontal=True,
 )
 st.session_state["mode"] = mode
 
+extractor = st.selectbox(
+    "Text extraction backend:",
+    options=EXTRACTORS,
+    index=EXTRACTORS.index(DEFAULT_EXTRACTORS[mode]),
+    help="pdfplumber is the reference; pdfium is much faster and is checked against it by benchmarks/conformance.py.",
+)
+
+early_stop = st.checkbox(
+    "Stop reading once the header is complete",
+    disabled=mode not in EARLY_STOP_MODES and mode != AUTO_MODE,
+    help="Wholesale/SK: skip the remaining pages of long orders once every column is found.",
+)
+
+workers = st.number_input(
+    "Parallel workers:",
+    min_value=1,
+    max_value=max(default_workers(), DEFAULT_PREWARM_WORKERS),
+    value=DEFAULT_PREWARM_WORKERS or default_workers(),
+    step=1,
+    disabled=DEFAULT_PREWARM_WORKERS > 0,
+    help="Fixed by PDF2EXCEL_PREWARM_WORKERS when the server keeps a pre-warmed worker pool.",
+)
+memory_limit_mb = st.number_input(
+    "Per-document memory limit (MB, 0 = off):",
+    min_value=0,
+    value=int(DEFAULT_DOC_MEMORY_MB),
+    step=64,
+    help="Files whose extraction grows memory past this limit are skipped with a warning. Measured in the worker process of each file; not applied to profiled runs.",
+)
+profile_run = st.checkbox(
+    "Profile this run",
+    help="Capture a cProfile of the whole run for download. Files are processed in this process so extraction shows up in the profile, without the per-document memory limit.",
+)
+
+use_store = st.checkbox(
+    "Keep parsed rows in the record store",
+    help=f"Rows are saved to {DEFAULT_STORE_PATH} (revisions replace earlier rows) and the report covers everything stored so far.",
+)
+incremental = st.checkbox(
+    "Only process files that are not in the store yet",
+    value=True,
+    disabled=not use_store,
+)
+
+stream_results = st.checkbox(
+    "Show progress while running",
+    value=True,
+    help="Process files in the background with a progress bar, an early preview and a Cancel button.",
+)
+
 # Initialize session_state
-if "df" not in st.session_state:
-    st.session_state.df = None
-if "excel_bytes" not in st.session_state:
-    st.session_state.excel_bytes = None
+if "reports" not in st.session_state:
+    # mode -> {"df": report DataFrame, "key": its content hash}; one entry per
+    # detected mode after an auto-detect run. Serialized reports are memoized
+    # under the hash.
+    st.session_state.reports = {}
 if "failed_files" not in st.session_state:
     st.session_state.failed_files = []
+if "run_stats" not in st.session_state:
+    st.session_state.run_stats = None
+if "profile" not in st.session_state:
+    st.session_state.profile = None
+if "job" not in st.session_state:
+    st.session_state.job = None
 
 uploaded_files = st.file_uploader(
-    "Please Upload PDF files here", type="pdf", accept_multiple_files=True
+    "Please Upload PDF files (or ZIP/TAR archives of PDFs) here",
+    type=["pdf", "zip", "tar", "tgz", "gz"],
+    accept_multiple_files=True,
 )
 st.write(f"Uploaded files: {len(uploaded_files) if uploaded_files else 0}")
 
+
+def finish_run(
+    collector: Union["BatchCollector", "MixedBatchCollector"], timer: StageTimer
+):
+    """Build the reports from the collected results and keep them in session_state."""
+    with timer.stage("dataframe (dedup/sort)"):
+        st.session_state.reports = {
+            report_mode: {"df": df, "key": frame_digest(df)}
+            for report_mode, df in collector.to_dataframes().items()
+        }
+    if not st.session_state.reports:
+        st.error(
+            "Error: Can not successfully parse ANY PDF files, no report will be generated."
+        )
+    else:
+        st.session_state.file_info = collector.file_info
+
+    st.session_state.run_stats = {
+        "stages": timer.timings,
+        "files": collector.file_stats,
+    }
+
+
 if st.button("Run!"):
     if uploaded_files:
-        if mode == "Wholesale":
-            po_parser = WholesalePOParser()
-            excel_writer = WholesaleExcelWriter()
-        elif mode == "SK":
-            po_parser = SKPOParser()
-            excel_writer = WholesaleExcelWriter()
-        else:
-            po_parser = RetailPOParser()
-            excel_writer = RetailExcelWriter()
-
-        result_list = []
-        revised_result_list = []
-        original_files = []
-        failed_files = []
-        revised_files = []
-        required_keys = excel_writer.output_schema
-
-        for upload_file in uploaded_files:
-            if (
-                (mode == "Wholesale" and "KP" not in upload_file.name)
-                or (mode == "Retail" and "DI" not in upload_file.name)
-                or (mode == "SK" and "SK" not in upload_file.name)
-            ):
-                st.warning(
-                    f"⚠️ Warning: PDF {upload_file.name} seems not a valid file type in mode {mode}, skipped."
-                )
-                failed_files.append(upload_file.name)
-                continue
-
-            file_type = "original"
-            try:
-                with pdfplumber.open(upload_file) as pdf:
-                    full_text = ""
-                    for page in pdf.pages:
-                        text = page.extract_text()
-                        if text:
-                            full_text += text + "\n"
-
-                    if mode == "Retail":
-                        words = pdf.pages[0].extract_words()
-
-            except Exception as e:
-                st.warning(
-                    f"⚠️ Warning: Failed to open/parse PDF: {upload_file.name} -> {e}"
-                )
-                failed_files.append(upload_file.name)
-                continue
-
-            if (
-                "This Purchase Order has been changed. Specific changes are shown in red."
-                in full_text
-            ):
-                file_type = "revised"
-            if mode == "Wholesale":
-                po_info = po_parser.parse_po_content(full_text, file_type=file_type)
-            elif mode == "SK":
-                po_parser.set_gt_crd_days(full_text)
-                po_info = po_parser.parse_po_content(full_text, file_type=file_type)
-            else:  # Retail
-                po_info = po_parser.parse_po_content(full_text, words)
-
-            if not po_info:
-                st.warning(
-                    f"⚠️ Warning: Can not parse/extract information from this PDF file: {upload_file.name}, file type: {file_type}"
-                )
-                failed_files.append(upload_file.name)
-                continue
-
-            missing_keys = [k for k in required_keys if k not in po_info[0]]
-            if missing_keys:
-                st.warning(
-                    f"⚠️ Warning: PDF {upload_file.name} (file type: {file_type}) missing columns: {missing_keys}, skipped."
-                )
-                failed_files.append(upload_file.name)
-                continue
-
-            if file_type == "revised":
-                revised_result_list.extend(po_info)
-                revised_files.append(upload_file.name)
-            else:
-                result_list.extend(po_info)
-                original_files.append(upload_file.name)
-
-        if not (result_list or revised_result_list):
-            st.error(
-                "Error: Can not successfully parse ANY PDF files, no report will be generated."
+        from pipeline.batch import create_collector
+        from pipeline.job import BatchJob
+
+        files = iter_uploaded_pdfs(uploaded_files)
+        pool = worker_pool()
+        if pool is not None and pool.failed:
+            pool = None
+        if st.session_state.job is not None:
+            st.session_state.job.cancel()
+            st.session_state.job = None
+
+        store = record_store() if use_store else None
+        if stream_results and not profile_run:
+            job = BatchJob(
+                files,
+                mode,
+                total=count_uploaded_pdfs(uploaded_files),
+                max_workers=workers,
+                cache=ExtractionCache(),
+                memory_limit_mb=memory_limit_mb or None,
+                store=store,
+                incremental=use_store and incremental,
+                extractor=extractor,
+                early_stop=early_stop,
+                memo=memo,
+                executor=pool.executor if pool else None,
             )
-            st.session_state.df = None
-            st.session_state.excel_bytes = None
+            job.start()
+            st.session_state.job = job
+            st.session_state.profile = None
         else:
-            original_df = pd.DataFrame(result_list)
-            revised_df = pd.DataFrame(revised_result_list)
-            if not revised_df.empty:
-                original_df = pd.concat([original_df, revised_df], ignore_index=True)
-            id_cols = (
-                ["PO#"] if mode in ("Wholesale", "SK") else ["Kohler PO", "Kohler SKU"]
-            )
-            df = (
-                original_df[required_keys]
-                .drop_duplicates(subset=id_cols, keep="last")
-                .sort_values(id_cols[0], kind="stable")
-                .reset_index(drop=True)
+            collector = create_collector(mode, store=store)
+            if use_store and incremental:
+                files = collector.new_files(files)
+            timer = StageTimer()
+            profiler = RunProfiler() if profile_run else None
+
+            with profiler or nullcontext():
+                with timer.stage("extract + parse (wall)"):
+                    for result in process_files(
+                        files,
+                        mode,
+                        max_workers=1 if profiler else workers,
+                        cache=ExtractionCache(),
+                        # inline, the guard would measure the shared server process
+                        memory_limit_mb=None if profiler else memory_limit_mb or None,
+                        extractor=extractor,
+                        early_stop=early_stop,
+                        memo=memo,
+                        executor=pool.executor if pool and not profiler else None,
+                    ):
+                        message = collector.add(result)
+                        if message:
+                            st.warning(message)
+
+                finish_run(collector, timer)
+
+            st.session_state.profile = (
+                {"data": profiler.to_bytes(), "summary": profiler.summary()}
+                if profiler
+                else None
             )
 
-            st.session_state.file_info = {
-                "original_files": original_files,
-                "revised_files": revised_files,
-                "failed_files": failed_files,
-            }
-            st.session_state.df = df
-            st.session_state.excel_bytes = excel_writer.write_excel(df)
+job = st.session_state.job
+if job is not None:
+    progress = job.progress()
+    if progress["total"]:
+        st.progress(
+            min(progress["processed"] / progress["total"], 1.0),
+            text=f"Processed {progress['processed']}/{progress['total']} files",
+        )
+    else:
+        # streamed tar archives: the number of files is not known up front
+        st.write(f"Processed {progress['processed']} files")
+    st.write(
+        f"Parsed: {progress['parsed']}, failed: {progress['failed']}, already stored: {progress['known']}"
+    )
+    for message in job.messages[:]:
+        st.warning(message)
 
-if st.session_state.df is not None:
-    st.dataframe(st.session_state.df.head())
+    if not job.done:
+        preview = job.preview()
+        if preview is not None:
+            st.dataframe(preview)
+        if st.button("Cancel"):
+            job.cancel()
+        time.sleep(0.5)
+        st.rerun()
+    else:
+        if job.cancelled:
+            st.info(
+                "Run cancelled, the report only includes the files processed so far."
+            )
+        if job.error:
+            st.error(f"Error: {job.error}")
+        finish_run(job.collector, job.timer)
+        st.session_state.job = None
 
-    st.download_button(
-        label="📥 Download Excel",
-        data=st.session_state.excel_bytes,
-        file_name=f"{mode.lower()}_orders_{datetime.now().date().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+if st.session_state.reports:
+    output_format = st.selectbox(
+        "Download format:",
+        options=list(OUTPUT_FORMATS),
+        format_func=lambda fmt: OUTPUT_FORMATS[fmt]["label"],
     )
+    for report_mode, report in st.session_state.reports.items():
+        if len(st.session_state.reports) > 1:
+            st.markdown(f"**{report_mode}** orders: {len(report['df'])} rows")
+        st.dataframe(report["df"].head())
+
+        report_writer = create_excel_writer(report_mode)
+        output_key = (
+            "report",
+            report["key"],
+            report_mode,
+            tuple(report_writer.output_schema),
+            output_format,
+        )
+        output = memo.get(output_key)
+        if output is None:
+            timer = StageTimer()
+            try:
+                with timer.stage(f"write {output_format}"):
+                    output = report_writer.write_output(
+                        report["df"], output_format, timer=timer
+                    )
+                memo.put(output_key, output)
+            except ImportError as e:
+                st.error(f"Error: {output_format} export is not available here -> {e}")
+            if st.session_state.run_stats is not None:
+                st.session_state.run_stats["stages"].update(timer.timings)
+        if output is not None:
+            st.download_button(
+                label=f"📥 Download {report_mode} {OUTPUT_FORMATS[output_format]['label']}",
+                data=output,
+                file_name=f"{report_mode.lower()}_orders_{datetime.now().date().strftime('%Y%m%d')}.{OUTPUT_FORMATS[output_format]['extension']}",
+                mime=OUTPUT_FORMATS[output_format]["mime"],
+                key=f"download_{report_mode}",
+            )
 
     if not st.session_state.file_info["failed_files"]:
         st.success("✅ All files parsed successfully!")
@@ -184,4 +330,47 @@ if st.session_state.df is not None:
             f"⚠️ Failed to parse some files below: {st.session_state.file_info['failed_files']}.\nPlease check them again."
         )
 
-    st.success("Please download the Excel file.")
+    if st.session_state.file_info["known_files"]:
+        st.info(
+            f"Skipped {len(st.session_state.file_info['known_files'])} files already in the record store."
+        )
+
+    st.success("Please download the report file.")
+
+if st.session_state.run_stats is not None:
+    with st.expander("⏱️ Run timings"):
+        import pandas as pd
+
+        run_stats = st.session_state.run_stats
+        file_stats = pd.DataFrame(run_stats["files"])
+        pages = int(file_stats["pages"].sum()) if not file_stats.empty else 0
+        st.write(f"Files: {len(file_stats)}, pages: {pages}")
+        st.write(
+            "Cold start (s after process start): "
+            + ", ".join(f"{event} {t:.2f}" for event, t in STARTUP.events.items())
+        )
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "stage": list(run_stats["stages"]),
+                    "seconds": list(run_stats["stages"].values()),
+                }
+            ),
+            hide_index=True,
+        )
+        st.dataframe(file_stats, hide_index=True)
+
+if st.session_state.profile is not None:
+    st.download_button(
+        label="📥 Download profile (.prof)",
+        data=st.session_state.profile["data"],
+        file_name=f"pdf2excel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof",
+        mime="application/octet-stream",
+    )
+    with st.expander("Profile summary"):
+        st.text(st.session_state.profile["summary"])
+
+# cold start: seconds from process start to the first complete page, the
+# pre-warmed workers and the first parsed file (shown under "Run timings")
+STARTUP.mark("first render")
+worker_pool()
@@ -0,0 +1,135 @@
+"""
+Check that an extraction backend gives the same parse results as pdfplumber.
+
+Runs every document through the reference backend and the candidate, parses
+both with parse_document and reports documents whose file type or rows differ.
+With --early-stop the candidate only reads pages until the header is complete
+(Wholesale/SK), and may be pdfplumber itself.
+
+    python -m benchmarks.conformance --candidate pdfium --modes Retail --count 100
+    python -m benchmarks.conformance --candidate pdfium --modes Retail --dir ./real_pos
+    python -m benchmarks.conformance --candidate pdfplumber --early-stop --modes Wholesale SK --items 60
+"""
+
+import argparse
+import os
+import sys
+from io import BytesIO
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from benchmarks.synthetic_po import generate_corpus
+from pipeline.ingest import (
+    EARLY_STOP_MODES,
+    EXTRACTORS,
+    FILE_NAME_MARKERS,
+    MODES,
+    extract_pdf,
+    extract_until_complete,
+    parse_document,
+)
+
+REFERENCE = "pdfplumber"
+
+
+def _parse_with(
+    extractor: str, mode: str, data: bytes, early_stop: bool = False
+) -> Tuple[Tuple, float]:
+    extract = (
+        extract_until_complete
+        if early_stop and mode in EARLY_STOP_MODES
+        else extract_pdf
+    )
+    start = perf_counter()
+    try:
+        full_text, words, _ = extract(BytesIO(data), mode, extractor=extractor)
+        elapsed = perf_counter() - start
+        return parse_document(mode, full_text, words), elapsed
+    except Exception as e:
+        return ("error", str(e)), perf_counter() - start
+
+
+def run_conformance(
+    mode: str, files: List[Tuple[str, bytes]], candidate: str, early_stop: bool = False
+) -> Dict:
+    """Compare candidate against the reference on (name, data) pairs of one mode."""
+    mismatches = []
+    seconds = {"reference": 0.0, "candidate": 0.0}
+    for name, data in files:
+        expected, t_ref = _parse_with(REFERENCE, mode, data)
+        actual, t_cand = _parse_with(candidate, mode, data, early_stop)
+        seconds["reference"] += t_ref
+        seconds["candidate"] += t_cand
+        if expected != actual:
+            mismatches.append({"name": name, "expected": expected, "actual": actual})
+    return {
+        "mode": mode,
+        "files": len(files),
+        "mismatches": mismatches,
+        "seconds": seconds,
+    }
+
+
+def _load_dir(path: str, mode: str) -> List[Tuple[str, bytes]]:
+    files = []
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if name.lower().endswith(".pdf") and FILE_NAME_MARKERS[mode] in name:
+                with open(os.path.join(root, name), "rb") as f:
+                    files.append((name, f.read()))
+    return files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--candidate",
+        default="pdfium",
+        choices=EXTRACTORS,
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="candidate stops reading once the header is complete",
+    )
+    parser.add_argument(
+        "--items", type=int, help="line items per synthetic PO (longer documents)"
+    )
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dir", help="use the PDFs in this directory instead of a synthetic corpus"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    candidate = args.candidate + (" (early stop)" if args.early_stop else "")
+    for mode in args.modes:
+        if args.dir:
+            files = _load_dir(args.dir, mode)
+        else:
+            files = generate_corpus(
+                mode,
+                args.count,
+                seed=args.seed,
+                revised_ratio=0.3,
+                n_items=args.items,
+            )
+        report = run_conformance(mode, files, args.candidate, args.early_stop)
+        seconds = report["seconds"]
+        print(
+            f"{mode:<10} files: {report['files']:>5}  mismatches: {len(report['mismatches']):>4}  "
+            f"{REFERENCE}: {seconds['reference']:.2f}s  {candidate}: {seconds['candidate']:.2f}s"
+        )
+        for mismatch in report["mismatches"][:5]:
+            print(f"  {mismatch['name']}:")
+            print(f"    {REFERENCE}: {mismatch['expected']}")
+            print(f"    {candidate}: {mismatch['actual']}")
+        failed = failed or bool(report["mismatches"])
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
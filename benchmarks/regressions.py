@@ -0,0 +1,168 @@
+"""
+End-to-end checks for documents that once broke a batch.
+
+Each check builds its PDFs with benchmarks.synthetic_po, runs them through
+the same path as the app and the CLI and prints PASS/FAIL.
+
+    python -m benchmarks.regressions
+"""
+
+import gzip
+import io
+import os
+import random
+import sys
+import tempfile
+import traceback
+import zipfile
+from typing import Callable, List, Tuple
+
+from benchmarks.conformance import run_conformance
+from benchmarks.synthetic_po import generate_corpus, retail_po, wholesale_po
+from pipeline.archive import iter_archive_pdfs
+from pipeline.batch import create_collector
+from pipeline.ingest import AUTO_MODE, MODES, create_excel_writer, process_files
+from pipeline.records import ColumnarAccumulator
+from pipeline.store import RecordStore
+
+
+def check_retail_row_missing_columns():
+    # the second item's "1,234.00" price doesn't match the item pattern, so
+    # its row lacks Kohler SKU, Qty, ...; the next file must stay intact
+    rnd = random.Random(0)
+    files = [
+        ("DI4500000001.pdf", retail_po("4500000001", rnd, 3, thousands_items=(2,))),
+        ("DI4500000002.pdf", retail_po("4500000002", rnd, 2)),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        # in memory and through the record store
+        for store in (None, RecordStore(os.path.join(tmp, "records.sqlite3"))):
+            collector = create_collector("Retail", store=store)
+            for result in process_files(files, "Retail", max_workers=1):
+                collector.add(result)
+            _check_missing_columns(collector)
+            if store is not None:
+                store.close()
+
+
+def _check_missing_columns(collector):
+    df = collector.to_dataframe()
+    assert collector.failed_files == [], collector.failures
+    assert len(df) == 5, len(df)
+    missing = df[df["Kohler SKU"].isna()]
+    assert len(missing) == 1, missing
+    assert missing["Qty"].isna().all() and missing["Unit Price"].isna().all()
+    assert (df["Kohler PO"] == "4500000002").sum() == 2
+    assert df.loc[df["Kohler SKU"].notna(), "Qty"].notna().all()
+
+
+def check_sk_early_stop_splash():
+    # "SPLASH" in a later item shortens the GT CRD, so early stop must not
+    # stop at the first item (SK4500000019 of this corpus only has it later)
+    files = generate_corpus("SK", 20, seed=0, revised_ratio=0.3, n_items=120)
+    report = run_conformance("SK", files, "pdfplumber", early_stop=True)
+    assert not report["mismatches"], [m["name"] for m in report["mismatches"]]
+
+
+def check_damaged_archives():
+    # a corrupt member, or an archive that can't be opened, fails on its own
+    rnd = random.Random(0)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(3):
+            zf.writestr(f"DI450000000{i}.pdf", retail_po(f"450000000{i}", rnd, 2))
+    data = bytearray(buffer.getvalue())
+    # garble the deflate stream of the second member
+    second = zipfile.ZipFile(io.BytesIO(data)).infolist()[1].header_offset
+    for i in range(second + 80, second + 120):
+        data[i] ^= 0xFF
+
+    def files():
+        yield from iter_archive_pdfs(io.BytesIO(bytes(data)), "pos.zip")
+        yield from iter_archive_pdfs(io.BytesIO(b"not a zip"), "broken.zip")
+        # a gzipped PDF is no archive; it fails unread rather than as a bad tar
+        pdf_gz = gzip.compress(retail_po("4500000008", rnd, 2))
+        yield from iter_archive_pdfs(io.BytesIO(pdf_gz), "DI4500000008.pdf.gz")
+        yield "DI4500000009.pdf", retail_po("4500000009", rnd, 2)
+
+    collector = create_collector("Retail")
+    for result in process_files(files(), "Retail", max_workers=1):
+        collector.add(result)
+    statuses = {f["name"]: f["status"] for f in collector.failures}
+    assert statuses == {
+        "DI4500000001.pdf": "unreadable",
+        "broken.zip": "unreadable",
+        "DI4500000008.pdf.gz": "unreadable",
+    }, statuses
+    assert collector.original_files == [
+        "DI4500000000.pdf",
+        "DI4500000002.pdf",
+        "DI4500000009.pdf",
+    ], collector.original_files
+
+
+def check_auto_mode_unmarked_wholesale():
+    # Wholesale items may mention SPLASH too: without a KP/SK name marker the
+    # order must be skipped, not parsed as SK
+    rnd = random.Random(0)
+    files = [
+        ("4500000001.pdf", wholesale_po("4500000001", rnd, splash=True)),
+        ("KP4500000002.pdf", wholesale_po("4500000002", rnd, splash=True)),
+    ]
+    collector = create_collector(AUTO_MODE)
+    for result in process_files(files, AUTO_MODE, max_workers=1):
+        collector.add(result)
+    statuses = {f["name"]: f["status"] for f in collector.failures}
+    assert statuses == {"4500000001.pdf": "ambiguous"}, statuses
+    assert list(collector.collectors) == ["Wholesale"], list(collector.collectors)
+
+
+def check_accumulator_matches_writer():
+    # the report columns come from the writer; a column added there must not
+    # be dropped or left untyped on the way
+    rnd = random.Random(0)
+    samples = {
+        "Wholesale": ("KP4500000001.pdf", wholesale_po("4500000001", rnd)),
+        "SK": ("SK4500000002.pdf", wholesale_po("4500000002", rnd, splash=True)),
+        "Retail": ("DI4500000003.pdf", retail_po("4500000003", rnd, 2)),
+    }
+    for mode in MODES:
+        writer = create_excel_writer(mode)
+        rows = ColumnarAccumulator(writer)
+        assert rows.columns == list(writer.output_schema), (mode, rows.columns)
+        for result in process_files([samples[mode]], mode, max_workers=1):
+            assert result["status"] == "ok", result
+            rows.extend_rows(result["po_info"])
+        df = rows.to_dataframe()
+        typed = writer.prepare_frame(df)
+        assert list(df.columns) == list(writer.output_schema), (mode, df.columns)
+        assert (df.dtypes == typed.dtypes).all(), (mode, df.dtypes, typed.dtypes)
+
+
+CHECKS: List[Tuple[str, Callable[[], None]]] = [
+    ("Report columns follow the writer schema", check_accumulator_matches_writer),
+    ("Retail row with missing columns", check_retail_row_missing_columns),
+    ("SK early stop reads on until SPLASH", check_sk_early_stop_splash),
+    ("Damaged archives fail per file", check_damaged_archives),
+    (
+        "Auto mode skips unmarked Wholesale/SK orders",
+        check_auto_mode_unmarked_wholesale,
+    ),
+]
+
+
+def main() -> int:
+    failed = False
+    for name, check in CHECKS:
+        try:
+            check()
+            print(f"PASS  {name}")
+        except Exception:
+            failed = True
+            print(f"FAIL  {name}")
+            traceback.print_exc()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Time each processing stage on synthetic purchase orders.
+
+    python -m benchmarks.run_benchmarks --modes Wholesale Retail --sizes 10 50 200
+"""
+
+import argparse
+import json
+from io import BytesIO
+from time import perf_counter
+from typing import Dict, List
+
+from benchmarks.synthetic_po import generate_corpus
+from excel_writer.formats import OUTPUT_FORMATS
+from pipeline.batch import BatchCollector
+from pipeline.ingest import (
+    MODES,
+    _get_parser,
+    create_excel_writer,
+    default_workers,
+    extract_pdf,
+    new_result,
+    parse_document,
+    process_files,
+)
+
+
+def _stage(name: str, seconds: float, files: int, rows: int) -> Dict:
+    return {
+        "stage": name,
+        "seconds": seconds,
+        "files_per_sec": files / seconds if seconds else float("inf"),
+        "rows_per_sec": rows / seconds if seconds else float("inf"),
+    }
+
+
+def bench_batch(mode: str, batch_size: int, seed: int, workers: int) -> List[Dict]:
+    files = generate_corpus(mode, batch_size, seed=seed)
+
+    start = perf_counter()
+    extracted = [extract_pdf(BytesIO(data), mode) for _, data in files]
+    extract_time = perf_counter() - start
+
+    start = perf_counter()
+    parsed = [parse_document(mode, text, words) for text, words, _ in extracted]
+    parse_time = perf_counter() - start
+    rows = sum(len(po_info) for _, po_info in parsed)
+
+    ship_to_time = None
+    if mode == "Retail":
+        po_parser = _get_parser(mode)
+        start = perf_counter()
+        for _, words, _ in extracted:
+            po_parser.extract_ship_to_first_line(words)
+        ship_to_time = perf_counter() - start
+
+    start = perf_counter()
+    collector = BatchCollector(mode)
+    for (name, _), (file_type, po_info) in zip(files, parsed):
+        result = new_result(name, status="ok")
+        result.update(file_type=file_type, po_info=po_info)
+        collector.add(result)
+    df = collector.to_dataframe()
+    dataframe_time = perf_counter() - start
+
+    write_times = {}
+    excel_writer = create_excel_writer(mode)
+    for fmt in OUTPUT_FORMATS:
+        start = perf_counter()
+        excel_writer.write_output(df, fmt)
+        write_times[fmt] = perf_counter() - start
+
+    start = perf_counter()
+    for _ in process_files(files, mode, max_workers=workers):
+        pass
+    pipeline_time = perf_counter() - start
+
+    stages = [
+        _stage("extract (pdfplumber)", extract_time, len(files), rows),
+        _stage("parse_po_content", parse_time, len(files), rows),
+    ]
+    if ship_to_time is not None:
+        stages.append(
+            _stage("extract_ship_to_first_line", ship_to_time, len(files), rows)
+        )
+    stages += [
+        _stage("dataframe assembly", dataframe_time, len(files), len(df)),
+        *[
+            _stage(f"write_output ({fmt})", t, len(files), len(df))
+            for fmt, t in write_times.items()
+        ],
+        _stage(f"process_files ({workers} workers)", pipeline_time, len(files), rows),
+    ]
+    for stage in stages:
+        stage.update({"mode": mode, "batch_size": batch_size, "rows": rows})
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 50, 200])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    header = f"{'mode':<10} {'files':>6} {'rows':>7}  {'stage':<32} {'seconds':>9} {'files/s':>10} {'rows/s':>11}"
+    print(header)
+    print("-" * len(header))
+    for mode in args.modes:
+        for size in args.sizes:
+            for stage in bench_batch(mode, size, args.seed, args.workers):
+                results.append(stage)
+                print(
+                    f"{mode:<10} {size:>6} {stage['rows']:>7}  {stage['stage']:<32} "
+                    f"{stage['seconds']:>9.3f} {stage['files_per_sec']:>10.1f} "
+                    f"{stage['rows_per_sec']:>11.1f}"
+                )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
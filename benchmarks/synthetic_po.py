@@ -0,0 +1,261 @@
+"""
+Synthetic purchase-order PDFs in the layout the parsers expect.
+
+The PDFs are written directly (one Helvetica font, absolutely positioned text
+runs), so no PDF library is needed to build a benchmark corpus.
+
+    python -m benchmarks.synthetic_po --mode Retail --count 50 --out ./corpus
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from pipeline.ingest import MODES, REVISED_MARKER
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 9
+LINE_HEIGHT = 14
+TOP_Y = 760
+BOTTOM_Y = 40
+LEFT_X = 40
+
+# (x, y, text) in PDF user space
+TextRun = Tuple[float, float, str]
+
+DESCRIPTIONS = [
+    ("TOILET BOWL WHITE", "ELONGATED COMFORT HEIGHT"),
+    ("VANITY TOP WHITE", "UNDERMOUNT SINK READY"),
+    ("BATH FAUCET CHROME", "WIDESPREAD 1.2 GPM"),
+    ("SHOWER VALVE TRIM", "BRUSHED NICKEL FINISH"),
+    ("KITCHEN SINK CAST IRON", "SPLASH GUARD INCLUDED"),
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[TextRun]]) -> bytes:
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    objects.append(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>"
+    )
+    kids = []
+    for runs in pages:
+        content = "".join(
+            f"BT /F1 {FONT_SIZE} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({_escape(text)}) Tj ET\n"
+            for x, y, text in runs
+        ).encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for obj_id, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % obj_id + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(out)
+
+
+class _PageWriter:
+    """Lays out text lines top to bottom, starting new pages when full."""
+
+    def __init__(self):
+        self.pages: List[List[TextRun]] = [[]]
+        self.y = TOP_Y
+
+    def line(self, *runs: Tuple[float, str]):
+        if self.y < BOTTOM_Y:
+            self.pages.append([])
+            self.y = TOP_Y
+        self.pages[-1].extend((x, self.y, text) for x, text in runs)
+        self.y -= LINE_HEIGHT
+
+    def text(self, text: str):
+        self.line((LEFT_X, text))
+
+    def block(self, lines: List[str]):
+        # keep a line-item block on one page
+        if self.y - (len(lines) - 1) * LINE_HEIGHT < BOTTOM_Y:
+            self.y = BOTTOM_Y - 1
+        for text in lines:
+            self.text(text)
+
+
+def _date(rnd: random.Random, start: datetime) -> datetime:
+    return start + timedelta(days=rnd.randint(0, 120))
+
+
+def _header(
+    writer: _PageWriter,
+    po_id: str,
+    create_date: datetime,
+    revised: bool = False,
+    retail: bool = False,
+):
+    writer.text("KOHLER CO.")
+    writer.text("444 HIGHLAND DRIVE KOHLER WI 53044")
+    writer.text(f"Purchase Order {po_id}")
+    filler = 15
+    if revised:
+        # pushes the date line one down, as in real revised orders
+        writer.text(REVISED_MARKER)
+    if retail:
+        # Bill-To anchor line and the Ship-To column below it,
+        # as read by RetailPOParser.extract_ship_to_first_line
+        writer.line((LEFT_X, "PNA"), (320, "REMIT TO"))
+        writer.line(
+            (LEFT_X, "B"),
+            (50, "HOME DEPOT INC"),
+            (175, "S"),
+            (185, "THD DI DFC #6707 - LUCKEY"),
+        )
+        writer.line((50, "PO BOX 105"), (185, "1200 MAIN ST"))
+        filler -= 3
+    for i in range(filler):
+        writer.text(f"REFERENCE {i + 1:02d} SHIP VIA BEST WAY")
+    # line 18 (19 on revised orders): "Date Terms Ship Via" values
+    writer.text(f"{create_date:%m/%d/%Y} NET 30 UPS GROUND")
+
+
+def _item_lines(rnd: random.Random, line_no: int, thousands: bool = False) -> List[str]:
+    desc1, desc2 = rnd.choice(DESCRIPTIONS)
+    material = f"K-{rnd.randint(1000, 99999)}-{rnd.randint(0, 9)}"
+    qty = rnd.randint(1, 40)
+    price = f"{rnd.randint(10, 2000)}.{rnd.randint(0, 99):02d}"
+    if thousands:
+        # "1,234.00" doesn't match the item pattern, the row misses its columns
+        price = f"{rnd.randint(1, 9)},{rnd.randint(0, 999):03d}.00"
+    return [
+        "Item Material No./Description Quantity UOM Unit Price",
+        f"{line_no * 10} EA {material} {desc1} {qty} EACH {price}",
+        desc2,
+    ]
+
+
+def wholesale_po(
+    po_id: str,
+    rnd: random.Random,
+    revised: bool = False,
+    splash: bool = False,
+    n_items: int = 1,
+) -> bytes:
+    writer = _PageWriter()
+    create_date = _date(rnd, datetime(2025, 1, 1))
+    _header(writer, po_id, create_date, revised=revised)
+    lines = _item_lines(rnd, 1)
+    if splash:
+        lines[2] = "SPLASH GUARD INCLUDED"
+    if revised:
+        # revised orders carry a change note between the header and the item
+        lines.insert(1, "CHANGED: QUANTITY")
+    lines.append(
+        f"Delivery Requested Date {create_date + timedelta(days=rnd.randint(20, 90)):%m/%d/%Y}"
+    )
+    writer.block(lines)
+    # further items only make the document longer, the parsers read the first one
+    for line_no in range(2, n_items + 1):
+        writer.block(_item_lines(rnd, line_no)[1:])
+    return build_pdf(writer.pages)
+
+
+def retail_po(
+    po_id: str,
+    rnd: random.Random,
+    n_items: int = 8,
+    thousands_items: Tuple[int, ...] = (),
+) -> bytes:
+    """thousands_items: line numbers whose price has a thousands separator."""
+    writer = _PageWriter()
+    create_date = _date(rnd, datetime(2025, 1, 1))
+    _header(writer, po_id, create_date, retail=True)
+    for line_no in range(1, n_items + 1):
+        lines = _item_lines(rnd, line_no, thousands=line_no in thousands_items)
+        lines += [
+            f"Kohler Sales Order Number KOHLER SALES ORDER {rnd.randint(10**7, 10**8 - 1)}",
+            f"Customer Purchase Order Number CUSTOMER PO {rnd.randint(10**7, 10**8 - 1)}",
+            f"Delivery Requested Date {create_date + timedelta(days=rnd.randint(20, 90)):%m/%d/%Y}",
+        ]
+        writer.block(lines)
+    return build_pdf(writer.pages)
+
+
+def generate_corpus(
+    mode: str,
+    count: int,
+    seed: int = 0,
+    revised_ratio: float = 0.1,
+    n_items: Optional[int] = None,
+) -> List[Tuple[str, bytes]]:
+    """
+    (file name, PDF bytes) pairs named the way the app expects for `mode`.
+    n_items sets the line items per PO (default: 2-14 for Retail, 1 otherwise).
+    """
+    rnd = random.Random(seed)
+    files = []
+    for i in range(count):
+        po_id = f"{4500000000 + i}"
+        if mode == "Retail":
+            files.append(
+                (
+                    f"DI{po_id}.pdf",
+                    retail_po(po_id, rnd, n_items=n_items or rnd.randint(2, 14)),
+                )
+            )
+        elif mode == "SK":
+            data = wholesale_po(
+                po_id,
+                rnd,
+                revised=rnd.random() < revised_ratio,
+                splash=rnd.random() < 0.5,
+                n_items=n_items or 1,
+            )
+            files.append((f"SK{po_id}.pdf", data))
+        else:
+            data = wholesale_po(
+                po_id, rnd, revised=rnd.random() < revised_ratio, n_items=n_items or 1
+            )
+            files.append((f"KP{po_id}.pdf", data))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", required=True, choices=MODES)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, data in generate_corpus(args.mode, args.count, seed=args.seed):
+        with open(os.path.join(args.out, name), "wb") as f:
+            f.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from excel_writer.formats import OUTPUT_FORMATS, XLSX_MAX_ROWS
+from pipeline.archive import (
+    DEFAULT_MAX_MEMBER_MB,
+    is_archive,
+    iter_archive_pdfs,
+    member_limit_bytes,
+)
+from pipeline.batch import create_collector
+from pipeline.cache import ExtractionCache
+from pipeline.ingest import (
+    AUTO_MODE,
+    EXTRACTORS,
+    MODES,
+    create_excel_writer,
+    default_workers,
+    process_files,
+)
+from pipeline.memory import DEFAULT_DOC_MEMORY_MB
+from pipeline.startup import STARTUP
+from pipeline.store import DEFAULT_STORE_PATH, RecordStore
+
+
+def expand_inputs(inputs: List[str], file_lists: List[str]) -> List[str]:
+    """
+    Directories (searched recursively for PDFs), glob patterns and plain paths.
+    Plain paths may also be ZIP/TAR archives of PDFs.
+    """
+    items = list(inputs)
+    for list_path in file_lists:
+        with open(list_path, "r", encoding="utf-8") as f:
+            items.extend(line.strip() for line in f if line.strip())
+
+    paths = []
+    for item in items:
+        if os.path.isdir(item):
+            matches = sorted(
+                path
+                for path in glob.glob(os.path.join(item, "**", "*"), recursive=True)
+                if path.lower().endswith(".pdf") and os.path.isfile(path)
+            )
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            raise FileNotFoundError(f"No such file or directory: {item}")
+        paths.extend(matches)
+
+    # keep the first occurrence, so the order given on the command line decides
+    # which file counts as the later revision
+    return list(dict.fromkeys(paths))
+
+
+def iter_files(
+    paths: List[str], max_member_bytes: Optional[int] = None
+) -> Iterator[Tuple[str, bytes]]:
+    for path in paths:
+        with open(path, "rb") as f:
+            if is_archive(path):
+                yield from iter_archive_pdfs(f, path, max_member_bytes)
+            else:
+                yield os.path.basename(path), f.read()
+
+
+def default_output(mode: str, fmt: str) -> str:
+    return f"{mode.lower()}_orders_{datetime.now().date().strftime('%Y%m%d')}.{OUTPUT_FORMATS[fmt]['extension']}"
+
+
+def auto_output(args: argparse.Namespace, mode: str) -> str:
+    """Output path of one detected mode's report in an auto-detect run."""
+    if args.output is None:
+        return default_output(mode, args.format)
+    stem, extension = os.path.splitext(args.output)
+    return f"{stem}_{mode.lower()}{extension}"
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Parse purchase order PDFs into an Excel report without the web UI."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="PDF files, ZIP/TAR archives, directories or glob patterns",
+    )
+    parser.add_argument(
+        "--mode",
+        required=True,
+        choices=MODES + [AUTO_MODE],
+        help=f"order type; {AUTO_MODE} detects it per file and writes one report per type (<output>_<type>.<ext>)",
+    )
+    parser.add_argument(
+        "--file-list",
+        action="append",
+        default=[],
+        help="text file with one PDF path per line (can be repeated)",
+    )
+    parser.add_argument(
+        "--extractor",
+        choices=EXTRACTORS,
+        help="text extraction backend (default: the mode's entry in DEFAULT_EXTRACTORS)",
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="Wholesale/SK: stop reading a PDF once every column is found",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="number of worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output path (default: <mode>_orders_<YYYYMMDD>.<format extension>)",
+    )
+    parser.add_argument(
+        "--format",
+        default="xlsx",
+        choices=list(OUTPUT_FORMATS),
+        help="output format: styled workbook (default), styled workbook streamed to disk, unstyled workbook, CSV or Parquet",
+    )
+    parser.add_argument(
+        "--sheet-rows",
+        type=int,
+        help="xlsx-stream: start a new sheet after this many rows (default: as many as a sheet holds)",
+    )
+    parser.add_argument(
+        "--report",
+        help="JSON report of parsed/failed files (default: <output>.report.json, '-' for stdout)",
+    )
+    parser.add_argument(
+        "--max-member-mb",
+        type=float,
+        default=DEFAULT_MAX_MEMBER_MB,
+        help=f"uncompressed MB of one PDF in an archive, larger ones fail unread (default: {DEFAULT_MAX_MEMBER_MB:g}, 0 = off)",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_DOC_MEMORY_MB,
+        help="skip documents whose extraction grows memory past this many MB (default: 0 = off)",
+    )
+    parser.add_argument(
+        "--store",
+        nargs="?",
+        const=DEFAULT_STORE_PATH,
+        help=f"keep parsed rows in a SQLite record store and build the workbook from all stored rows (default path: {DEFAULT_STORE_PATH})",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process files that are not in the record store yet (implies --store)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="disable the extraction cache"
+    )
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        paths = expand_inputs(args.inputs, args.file_list)
+    except OSError as e:
+        parser.error(str(e))
+    if args.sheet_rows is not None and not 0 < args.sheet_rows < XLSX_MAX_ROWS:
+        parser.error(f"--sheet-rows must be between 1 and {XLSX_MAX_ROWS - 1}")
+    if args.incremental and args.store is None:
+        args.store = DEFAULT_STORE_PATH
+    # an incremental run without inputs just regenerates the workbook from the store
+    if not paths and not args.incremental:
+        parser.error("no PDF files found")
+
+    output = args.output or default_output(args.mode, args.format)
+    report_path = args.report or os.path.splitext(output)[0] + ".report.json"
+    cache = None if args.no_cache else ExtractionCache()
+
+    store = RecordStore(args.store) if args.store else None
+    collector = create_collector(args.mode, store=store)
+    files = iter_files(paths, member_limit_bytes(args.max_member_mb))
+    if args.incremental:
+        files = collector.new_files(files)
+    for result in process_files(
+        files,
+        args.mode,
+        max_workers=args.workers,
+        cache=cache,
+        memory_limit_mb=args.memory_limit_mb or None,
+        extractor=args.extractor,
+        early_stop=args.early_stop,
+    ):
+        message = collector.add(result)
+        if message:
+            print(message, file=sys.stderr)
+
+    reports = collector.to_dataframes()
+    outputs = {}
+    for report_mode, df in reports.items():
+        path = output if args.mode != AUTO_MODE else auto_output(args, report_mode)
+        writer = create_excel_writer(report_mode)
+        if args.format == "xlsx-stream":
+            # rows go straight to the file, the workbook is never held in memory
+            writer.stream_excel(df, path, sheet_rows=args.sheet_rows)
+        else:
+            try:
+                data = writer.write_output(df, args.format)
+            except ImportError as e:
+                print(
+                    f"Error: {args.format} output is not available -> {e}",
+                    file=sys.stderr,
+                )
+                return 1
+            with open(path, "wb") as f:
+                f.write(data)
+        outputs[report_mode] = path
+    if not reports:
+        print(
+            "Error: Can not successfully parse ANY PDF files, no report will be generated.",
+            file=sys.stderr,
+        )
+
+    report = {"mode": args.mode}
+    if args.mode == AUTO_MODE:
+        report["outputs"] = {
+            report_mode: {"output": outputs[report_mode], "rows": len(df)}
+            for report_mode, df in reports.items()
+        }
+    else:
+        report["output"] = outputs.get(args.mode)
+        report["rows"] = len(reports[args.mode]) if reports else 0
+    report.update(
+        **collector.file_info,
+        failures=collector.failures,
+        # seconds from process start, to compare cold starts across deployments
+        startup=STARTUP.events,
+    )
+    if report_path == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    return 0 if reports else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+from typing import Dict
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# rows per worksheet, header included
+XLSX_MAX_ROWS = 1048576
+
+# Output formats: styled workbook, plus unstyled ones for loading into other systems
+OUTPUT_FORMATS: Dict[str, Dict[str, str]] = {
+    "xlsx": {"label": "Excel (styled)", "extension": "xlsx", "mime": XLSX_MIME},
+    "xlsx-stream": {
+        "label": "Excel (styled, streamed, for very large reports)",
+        "extension": "xlsx",
+        "mime": XLSX_MIME,
+    },
+    "xlsx-fast": {
+        "label": "Excel (unstyled, fast)",
+        "extension": "xlsx",
+        "mime": XLSX_MIME,
+    },
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv"},
+    "parquet": {
+        "label": "Parquet",
+        "extension": "parquet",
+        "mime": "application/vnd.apache.parquet",
+    },
+}
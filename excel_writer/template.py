@@ -1,11 +1,33 @@
-from datetime import datetime
-from typing import Dict, List
+from contextlib import contextmanager
+from io import BytesIO
+from typing import IO, ContextManager, Dict, Iterator, List, Optional, Protocol, Union
 
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
 from openpyxl.utils import get_column_letter
 
+# the format table lives in excel_writer.formats so it can be read without
+# importing pandas/openpyxl; re-exported here for existing imports
+from excel_writer.formats import OUTPUT_FORMATS, XLSX_MAX_ROWS, XLSX_MIME  # noqa: F401
+
+
+class StageTimer(Protocol):
+    """What the writers need from a timer (e.g. pipeline.timing.StageTimer)."""
+
+    def stage(self, name: str) -> ContextManager: ...
+
+
+@contextmanager
+def timed_stage(timer: Optional[StageTimer], name: str):
+    """timer.stage(name), or nothing when no timer is given."""
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
 
 class ExcelWriter:
     @property
@@ -35,76 +57,294 @@ class ExcelWriter:
             "data_font_size": 12,
         }
 
-    def write_excel(
-        self,
-        df: pd.DataFrame,
-    ):
-        temp_file = "temp.xlsx"
-        df = df.loc[:, self.output_schema]
-        df.to_excel(temp_file, index=False, engine="openpyxl")
+    @property
+    def date_format(self) -> str:
+        return "MM-DD-YYYY"
 
-        wb = load_workbook(temp_file)
-        ws = wb.active
+    @property
+    def sheet_rows(self) -> int:
+        # data rows per sheet before a streamed workbook starts a new one
+        return XLSX_MAX_ROWS - 1
 
-        # Header style
-        header_fill = PatternFill(
-            start_color=self.style_config["header_color"],
-            end_color=self.style_config["header_color"],
-            fill_type="solid",
-        )
-        header_font = Font(
-            name=self.style_config["header_font_name"],
-            size=self.style_config["header_font_size"],
-            bold=self.style_config["header_bold"],
-        )
+    @property
+    def stream_chunk_rows(self) -> int:
+        # rows prepared at a time by stream_excel
+        return 10000
+
+    def number_format(self, col_name: str) -> str:
+        # Qty is a whole number, Unit Price and others keep 2 decimals
+        return "0" if col_name == "Qty" else "0.00"
+
+    def prepare_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Select output_schema columns and cast number/date columns column-wise,
+        so cells are written with their final types.
+        """
+        df = df.loc[:, self.output_schema].copy()
+        for col_name in self.number_columns:
+            values = pd.to_numeric(df[col_name])
+            if self.number_format(col_name) == "0":
+                df[col_name] = values.astype("Int64")
+            else:
+                df[col_name] = values.astype("float64")
+        for col_name in self.date_columns:
+            df[col_name] = pd.to_datetime(df[col_name])
+        return df
 
-        for col_idx, col_name in enumerate(df.columns, 1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.fill = header_fill
-            cell.font = header_font
+    def column_widths(self, df: pd.DataFrame) -> List[float]:
+        widths = []
+        for col_name in df.columns:
+            values = df[col_name]
+            if col_name in self.number_columns and pd.api.types.is_numeric_dtype(
+                values
+            ):
+                # typed numbers are measured as their number format shows them
+                decimals = 0 if self.number_format(col_name) == "0" else 2
+                text = values.map(lambda v: f"{v:.{decimals}f}", na_action="ignore")
+            else:
+                text = values.astype(str)
+            max_length = text.str.len().max()
+            if pd.isna(max_length):
+                max_length = 0
+            widths.append(max(max_length, len(col_name)) + self.col_length_offset)
+        return widths
 
-        # Data style
+    def _named_styles(self) -> Dict[str, NamedStyle]:
+        side = Side(style="thin")
+        header = NamedStyle(
+            name="po_header",
+            font=Font(
+                name=self.style_config["header_font_name"],
+                size=self.style_config["header_font_size"],
+                bold=self.style_config["header_bold"],
+            ),
+            fill=PatternFill(
+                start_color=self.style_config["header_color"],
+                end_color=self.style_config["header_color"],
+                fill_type="solid",
+            ),
+            border=Border(left=side, right=side, top=side, bottom=side),
+            alignment=Alignment(horizontal="center", vertical="top"),
+        )
         data_font = Font(
             name=self.style_config["data_font_name"],
             size=self.style_config["data_font_size"],
         )
-        for row in ws.iter_rows(
-            min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column
-        ):
-            for cell in row:
-                cell.font = data_font
-
-        # Set column format
-        for row in range(2, ws.max_row + 1):
-            # Data columns
-            for col_name in self.date_columns:
-                col_idx = df.columns.get_loc(col_name) + 1
-                cell = ws.cell(row=row, column=col_idx)
-                if isinstance(cell.value, datetime):
-                    cell.number_format = "MM-DD-YYYY"
-
-            # Number columns
-            for col_name in self.number_columns:
-                col_idx = df.columns.get_loc(col_name) + 1
-                cell = ws.cell(row=row, column=col_idx)
-                if col_name == "Qty":
-                    if isinstance(cell.value, str):
-                        cell.value = int(cell.value)
-                    cell.number_format = "0"
-                else:  # Unit Price or others
-                    if isinstance(cell.value, str):
-                        cell.value = float(cell.value)
-                    cell.number_format = "0.00"
-
-        # adjust column width
-        for col_idx, col_name in enumerate(df.columns, 1):
-            max_length = (
-                max(df[col_name].astype(str).map(len).max(), len(col_name))
-                + self.col_length_offset
-            )
-            ws.column_dimensions[get_column_letter(col_idx)].width = max_length
-
-        wb.save(temp_file)
-
-        with open(temp_file, "rb") as f:
-            return f.read()
+        return {
+            "header": header,
+            "text": NamedStyle(name="po_text", font=data_font),
+            "date": NamedStyle(
+                name="po_date", font=data_font, number_format=self.date_format
+            ),
+            "0": NamedStyle(name="po_integer", font=data_font, number_format="0"),
+            "0.00": NamedStyle(name="po_decimal", font=data_font, number_format="0.00"),
+        }
+
+    def column_style_names(self, df: pd.DataFrame, styles: Dict) -> List[str]:
+        names = []
+        for col_name in df.columns:
+            if col_name in self.date_columns:
+                names.append(styles["date"].name)
+            elif col_name in self.number_columns:
+                names.append(styles[self.number_format(col_name)].name)
+            else:
+                names.append(styles["text"].name)
+        return names
+
+    def write_excel(
+        self,
+        df: pd.DataFrame,
+        timer: Optional[StageTimer] = None,
+    ) -> bytes:
+        if len(df) > self.sheet_rows:
+            # more rows than one sheet holds: split them over several sheets
+            return self.write_stream_excel(df, timer=timer)
+
+        with timed_stage(timer, "excel: prepare"):
+            widths = self.column_widths(df.loc[:, self.output_schema])
+            df = self.prepare_frame(df)
+            # missing values become empty cells
+            values = df.astype(object).where(df.notna(), None)
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+
+        styles = self._named_styles()
+        for style in styles.values():
+            wb.add_named_style(style)
+        header_style = styles["header"].name
+        column_styles = self.column_style_names(df, styles)
+
+        with timed_stage(timer, "excel: cells"):
+            ws.append(list(df.columns))
+            for cell in ws[1]:
+                cell.style = header_style
+
+            for row in values.itertuples(index=False, name=None):
+                cells = []
+                for value, style_name in zip(row, column_styles):
+                    cell = Cell(ws, value=value)
+                    cell.style = style_name
+                    cells.append(cell)
+                ws.append(cells)
+
+            for col_idx, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        with timed_stage(timer, "excel: save"):
+            buffer = BytesIO()
+            wb.save(buffer)
+        return buffer.getvalue()
+
+    def _chunks(self, df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """df in slices of stream_chunk_rows rows."""
+        step = self.stream_chunk_rows
+        for start in range(0, len(df), step):
+            yield df.iloc[start : start + step]
+
+    def stream_excel(
+        self,
+        df: pd.DataFrame,
+        output: Union[str, IO[bytes]],
+        timer: Optional[StageTimer] = None,
+        sheet_rows: Optional[int] = None,
+    ) -> int:
+        """
+        Same styled workbook as write_excel, saved to `output` (a path or a
+        binary file) from a write-only workbook: rows are prepared chunk by
+        chunk and serialized as they are appended, so no cell objects are
+        kept for the whole workbook (df itself is, and so is the file when
+        `output` is in memory). Every sheet_rows rows (default: as many as a
+        sheet holds) a new sheet with its own header is started: Sheet1,
+        Sheet2, ...
+        Returns the number of sheets written.
+        """
+        sheet_rows = sheet_rows or self.sheet_rows
+        if not 0 < sheet_rows < XLSX_MAX_ROWS:
+            raise ValueError(f"sheet_rows must be between 1 and {XLSX_MAX_ROWS - 1}")
+
+        with timed_stage(timer, "excel: prepare"):
+            # write-only sheets need their column widths before the first row
+            chunk_widths = [
+                self.column_widths(chunk)
+                for chunk in self._chunks(df.loc[:, self.output_schema])
+            ]
+            if chunk_widths:
+                widths = [max(column) for column in zip(*chunk_widths)]
+            else:
+                widths = [len(c) + self.col_length_offset for c in self.output_schema]
+
+        wb = Workbook(write_only=True)
+        styles = self._named_styles()
+        for style in styles.values():
+            wb.add_named_style(style)
+        header_style = styles["header"].name
+        columns = list(self.output_schema)
+        column_styles = self.column_style_names(df.loc[:, columns], styles)
+
+        sheets = []
+
+        def new_sheet():
+            ws = wb.create_sheet(f"Sheet{len(sheets) + 1}")
+            for col_idx, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(col_idx)].width = width
+            header = []
+            for col_name in columns:
+                cell = WriteOnlyCell(ws, value=col_name)
+                cell.style = header_style
+                header.append(cell)
+            ws.append(header)
+            sheets.append(ws)
+            # one styled cell per column, reused: rows are serialized on append
+            cells = []
+            for style_name in column_styles:
+                cell = WriteOnlyCell(ws)
+                cell.style = style_name
+                cells.append(cell)
+            return ws, cells
+
+        ws, cells = new_sheet()
+        written = 0
+        for chunk in self._chunks(df):
+            with timed_stage(timer, "excel: prepare"):
+                chunk = self.prepare_frame(chunk)
+                values = chunk.astype(object).where(chunk.notna(), None)
+            with timed_stage(timer, "excel: cells"):
+                for row in values.itertuples(index=False, name=None):
+                    if written == sheet_rows:
+                        ws, cells = new_sheet()
+                        written = 0
+                    for cell, value in zip(cells, row):
+                        cell.value = value
+                    ws.append(cells)
+                    written += 1
+
+        with timed_stage(timer, "excel: save"):
+            wb.save(output)
+        return len(sheets)
+
+    def write_stream_excel(
+        self,
+        df: pd.DataFrame,
+        timer: Optional[StageTimer] = None,
+        sheet_rows: Optional[int] = None,
+    ) -> bytes:
+        """stream_excel into memory, for callers that need the bytes; the whole file is held."""
+        buffer = BytesIO()
+        self.stream_excel(df, buffer, timer=timer, sheet_rows=sheet_rows)
+        return buffer.getvalue()
+
+    def write_fast_excel(
+        self, df: pd.DataFrame, timer: Optional[StageTimer] = None
+    ) -> bytes:
+        """Typed values without fonts, fills or column widths, in write-only mode."""
+        with timed_stage(timer, "excel: prepare"):
+            df = self.prepare_frame(df)
+            values = df.astype(object).where(df.notna(), None)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        with timed_stage(timer, "excel: cells"):
+            ws.append(list(df.columns))
+            for row in values.itertuples(index=False, name=None):
+                ws.append(row)
+
+        with timed_stage(timer, "excel: save"):
+            buffer = BytesIO()
+            wb.save(buffer)
+        return buffer.getvalue()
+
+    def write_csv(self, df: pd.DataFrame, timer: Optional[StageTimer] = None) -> bytes:
+        with timed_stage(timer, "csv: prepare"):
+            df = self.prepare_frame(df)
+        with timed_stage(timer, "csv: save"):
+            # utf-8-sig so Excel opens non-ASCII descriptions correctly
+            return df.to_csv(index=False, date_format="%Y-%m-%d").encode("utf-8-sig")
+
+    def write_parquet(
+        self, df: pd.DataFrame, timer: Optional[StageTimer] = None
+    ) -> bytes:
+        # needs pyarrow (or fastparquet); pandas raises ImportError without it
+        with timed_stage(timer, "parquet: prepare"):
+            df = self.prepare_frame(df)
+        with timed_stage(timer, "parquet: save"):
+            buffer = BytesIO()
+            df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+
+    def write_output(
+        self, df: pd.DataFrame, fmt: str, timer: Optional[StageTimer] = None
+    ) -> bytes:
+        """Serialize df in one of OUTPUT_FORMATS."""
+        if fmt == "xlsx":
+            return self.write_excel(df, timer=timer)
+        if fmt == "xlsx-stream":
+            return self.write_stream_excel(df, timer=timer)
+        if fmt == "xlsx-fast":
+            return self.write_fast_excel(df, timer=timer)
+        if fmt == "csv":
+            return self.write_csv(df, timer=timer)
+        if fmt == "parquet":
+            return self.write_parquet(df, timer=timer)
+        raise ValueError(f"Unknown output format: {fmt}")
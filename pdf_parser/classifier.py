@@ -0,0 +1,30 @@
+from typing import Optional
+
+from pdf_parser.template import ANCHORS, PATTERNS
+
+# part of the cache key of auto-detected results, bump when the rules change
+CLASSIFIER_VERSION = "2"
+
+# lines every Retail item carries and the Wholesale layout doesn't have
+_RETAIL_ANCHORS = (ANCHORS["sale_order"], ANCHORS["customer_po"])
+
+# Wholesale or SK order without a file name telling which
+AMBIGUOUS = "ambiguous"
+
+
+def classify_po(first_page_text: str, name_hint: Optional[str] = None) -> Optional[str]:
+    """
+    Order type ("Wholesale", "SK" or "Retail") of a PO from its first page,
+    None if the page has no "Purchase Order <id>" line.
+    Retail orders are told apart by their per-item sales order / customer PO
+    lines. Wholesale and SK orders share one layout, header included, so only
+    the mode given by the file name (name_hint) decides between them; without
+    one AMBIGUOUS is returned ("SPLASH" appears in Wholesale items too).
+    """
+    if not PATTERNS["po_id"].search(first_page_text):
+        return None
+    if any(anchor in first_page_text for anchor in _RETAIL_ANCHORS):
+        return "Retail"
+    if name_hint in ("Wholesale", "SK"):
+        return name_hint
+    return AMBIGUOUS
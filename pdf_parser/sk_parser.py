@@ -1,21 +1,13 @@
+from pdf_parser.template import DocumentContext
 from pdf_parser.wholesale_parser import WholesalePOParser
 
 
 class SKPOParser(WholesalePOParser):
-    def __init__(self):
-        super().__init__()
-        self._gt_crd_days = None
-
-    def set_gt_crd_days(self, text: str):
-        if "SPLASH" in text:
-            self._gt_crd_days = 45
-        else:
-            self._gt_crd_days = 60
-
-    @property
-    def gt_crd_days(self) -> int:
-        if self._gt_crd_days is None:
-            raise ValueError(
-                "gt_crd_days is not set. Please call set_gt_crd_days() first."
-            )
-        return self._gt_crd_days
+    def context_for(self, text: str, file_type: str = "original") -> DocumentContext:
+        # orders with a splash guard get a shorter GT CRD
+        gt_crd_days = 45 if "SPLASH" in text else 60
+        return DocumentContext(file_type=file_type, gt_crd_days=gt_crd_days)
+
+    def context_is_final(self, text: str) -> bool:
+        # "SPLASH" may still turn up in a later item until a page has it
+        return "SPLASH" in text
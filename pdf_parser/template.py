@@ -1,4 +1,87 @@
-from typing import List, Dict
+import re
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional
+
+# Precompiled patterns shared by the parsers
+PATTERNS = {
+    "po_id": re.compile(r"Purchase Order\s+([A-Z0-9]+)"),
+    "date": re.compile(r"(\d{2}/\d{2}/\d{4})"),
+    "due_date": re.compile(r"Delivery Requested Date\s+(\d{2}/\d{2}/\d{4})"),
+    "sale_order": re.compile(r"KOHLER SALES ORDER\s+([A-Z0-9\-]+)"),
+    "customer_po": re.compile(r"CUSTOMER PO\s+([A-Z0-9\-]+)"),
+    "wholesale_item": re.compile(
+        r"\d+\s+\w+\s+([A-Z0-9\-]+)\s+(.+?)\s+(\d+)\s+EACH\s+(\d*\.\d+)"
+    ),
+    "retail_item": re.compile(
+        r"\d+\s+\w+\s+([A-Z0-9\-]+)\s+(.+?)\s+(\d+)\s+EACH\s+(\d+\.\d+)"
+    ),
+}
+
+# Anchor phrases located by AnchorIndex.
+# "Purchase Order" is only reported where it is not part of
+# "Customer Purchase Order Number".
+ANCHORS = {
+    "info": "No./Description",
+    "sale_order": "Kohler Sales Order Number",
+    "customer_po": "Customer Purchase Order Number",
+    "delivery_requested_date": "Delivery Requested Date",
+    "purchase_order": "Purchase Order",
+}
+
+# longer phrases first, so they win over the phrases they contain
+_ANCHOR_RE = re.compile(
+    "|".join(
+        f"(?P<{name}>{re.escape(phrase)})"
+        for name, phrase in sorted(ANCHORS.items(), key=lambda kv: -len(kv[1]))
+    )
+)
+
+
+class AnchorIndex:
+    """
+    Finds all ANCHORS in one pass over the text.
+        lines: stripped, non-empty lines (same as the parsers used to build)
+        positions: anchor name -> indexes into `lines` containing the anchor
+        offsets: anchor name -> character offsets of each match in `text`
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: List[str] = []
+        line_starts = []
+        offset = 0
+        for raw_line in text.splitlines(keepends=True):
+            line = raw_line.strip()
+            if line:
+                self.lines.append(line)
+                line_starts.append(offset)
+            offset += len(raw_line)
+
+        self.positions: Dict[str, List[int]] = {name: [] for name in ANCHORS}
+        self.offsets: Dict[str, List[int]] = {name: [] for name in ANCHORS}
+        for match in _ANCHOR_RE.finditer(text):
+            name = match.lastgroup
+            line_idx = bisect_right(line_starts, match.start()) - 1
+            positions = self.positions[name]
+            if not positions or positions[-1] != line_idx:
+                positions.append(line_idx)
+            self.offsets[name].append(match.start())
+
+
+class DocumentContext(NamedTuple):
+    """
+    Per-document parse settings. Immutable and passed to every
+    parse_po_content call, so parser instances hold no per-document state
+    and can be shared across threads and pool workers.
+    """
+
+    file_type: str = "original"
+    gt_crd_days: int = 70
+
+    @property
+    def revised(self) -> bool:
+        return self.file_type == "revised"
+
 
 class POParser:
     def __init__(self):
@@ -6,7 +89,31 @@ class POParser:
 
     @property
     def gt_crd_days(self) -> int:
+        # default GT CRD offset; context_for may pick another one per document
         return 70
 
-    def parse_po_content(self, text: str, file_type: str = "original") -> List[Dict]:
-        raise NotImplementedError("Subclasses should implement this method")
\ No newline at end of file
+    def context_for(self, text: str, file_type: str = "original") -> DocumentContext:
+        """Settings for one document, derived from its full text."""
+        return DocumentContext(file_type=file_type, gt_crd_days=self.gt_crd_days)
+
+    def context_is_final(self, text: str) -> bool:
+        """
+        Whether this page's text settles context_for() of the document, so
+        that reading more could no longer change it. Early stop calls it on
+        each page in turn and keeps reading until one page returned True.
+        """
+        return True
+
+    @property
+    def version(self) -> str:
+        # bump when parsing output changes, so cached results are invalidated
+        return "1"
+
+    def parse_po_content(
+        self,
+        text: str,
+        context: Optional[DocumentContext] = None,
+        words: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
+        """context defaults to context_for(text); words are only used by Retail."""
+        raise NotImplementedError("Subclasses should implement this method")
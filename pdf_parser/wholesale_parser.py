@@ -1,23 +1,27 @@
-import re
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from pdf_parser.template import POParser
+from pdf_parser.template import PATTERNS, AnchorIndex, DocumentContext, POParser
 
 
 class WholesalePOParser(POParser):
     def parse_po_content(
-        self, text: str, file_type: str = "original", debug: bool = False
+        self,
+        text: str,
+        context: Optional[DocumentContext] = None,
+        words: Optional[List[Dict]] = None,
+        debug: bool = False,
     ) -> List[Dict]:
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if context is None:
+            context = self.context_for(text)
+        anchors = AnchorIndex(text)
+        lines = anchors.lines
         PO_ID_POSITION = 2
-        CREATE_DATE_POSITION = 18 if file_type == "original" else 19
+        CREATE_DATE_POSITION = 19 if context.revised else 18
         INFO_POSITION = -1
-        target_pattern = "No./Description"
-        for i, line in enumerate(lines):
-            if target_pattern in line:
-                INFO_POSITION = i + 1 if file_type == "original" else i + 2
-                break
+        if anchors.positions["info"]:
+            i = anchors.positions["info"][0]
+            INFO_POSITION = i + 2 if context.revised else i + 1
         if debug:
             print(
                 f"DEBUG: PO_ID_POSITION={PO_ID_POSITION}, CREATE_DATE_POSITION={CREATE_DATE_POSITION}, INFO_POSITION={INFO_POSITION}"
@@ -27,16 +31,13 @@ class WholesalePOParser(POParser):
 
         # PO# ("Purchase Order xxxxxx")
         if len(lines) >= PO_ID_POSITION + 1:
-            po_match = re.search(r"Purchase Order\s+([A-Z0-9]+)", lines[PO_ID_POSITION])
+            po_match = PATTERNS["po_id"].search(lines[PO_ID_POSITION])
             if po_match:
                 result["PO#"] = po_match.group(1)
 
         # Material, Description, Qty, Unit Price (use "EACH" as anchor)
         if len(lines) >= INFO_POSITION + 2:
-            mdqu_match = re.search(
-                r"\d+\s+\w+\s+([A-Z0-9\-]+)\s+(.+?)\s+(\d+)\s+EACH\s+(\d*\.\d+)",
-                lines[INFO_POSITION],
-            )
+            mdqu_match = PATTERNS["wholesale_item"].search(lines[INFO_POSITION])
             if mdqu_match:
                 result["Material"] = mdqu_match.group(1)
                 desc_part1 = mdqu_match.group(2).strip()
@@ -47,21 +48,26 @@ class WholesalePOParser(POParser):
 
         # Create Date (first item in the next line of "Date Terms Ship Via")
         if len(lines) >= CREATE_DATE_POSITION + 1:
-            date_match = re.search(r"(\d{2}/\d{2}/\d{4})", lines[CREATE_DATE_POSITION])
+            date_match = PATTERNS["date"].search(lines[CREATE_DATE_POSITION])
             if date_match:
                 create_date_str = date_match.group(1)
                 result["Create Date"] = datetime.strptime(create_date_str, "%m/%d/%Y")
 
         # Due Date (right after "Delivery Requested Date")
-        due_date_match = re.search(
-            r"Delivery Requested Date\s+(\d{2}/\d{2}/\d{4})", text
-        )
+        # start at the first anchor instead of searching the whole text again
+        due_date_match = None
+        if anchors.offsets["delivery_requested_date"]:
+            due_date_match = PATTERNS["due_date"].search(
+                text, anchors.offsets["delivery_requested_date"][0]
+            )
         if due_date_match:
             due_date_str = due_date_match.group(1)
             result["Due Date"] = datetime.strptime(due_date_str, "%m/%d/%Y")
 
         # calculate GT CRD
         if "Create Date" in result.keys():
-            result["GT CRD"] = result["Create Date"] + timedelta(days=self.gt_crd_days)
+            result["GT CRD"] = result["Create Date"] + timedelta(
+                days=context.gt_crd_days
+            )
 
         return [result]
@@ -0,0 +1,72 @@
+from operator import itemgetter
+from typing import Dict, List
+
+import numpy as np
+
+
+class WordIndex:
+    """
+    Compact word geometry: the word texts plus float arrays of x0/x1/top,
+    so line and box queries are vectorized masks instead of loops over dicts.
+    Words missing a coordinate are dropped. Query results are arrays of word
+    positions in the original order of `words`.
+    """
+
+    def __init__(self, words: List[Dict]):
+        try:
+            self._load(words)
+        except KeyError:
+            self._load(
+                [
+                    w
+                    for w in words
+                    if "text" in w and "x0" in w and "x1" in w and "top" in w
+                ]
+            )
+
+    def _load(self, words: List[Dict]):
+        n = len(words)
+        self.texts: List[str] = list(map(str.strip, map(itemgetter("text"), words)))
+        self.x0 = np.fromiter(map(itemgetter("x0"), words), np.float64, n)
+        self.x1 = np.fromiter(map(itemgetter("x1"), words), np.float64, n)
+        self.top = np.fromiter(map(itemgetter("top"), words), np.float64, n)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def containing(self, keyword: str) -> np.ndarray:
+        """Positions of words whose upper-cased text contains `keyword` (upper-case)."""
+        joined = "\n".join(self.texts)
+        upper = joined.upper()
+        if not keyword or "\n" in keyword or len(upper) != len(joined):
+            # offsets below assume upper() keeps every text's length
+            return np.array(
+                [i for i, text in enumerate(self.texts) if keyword in text.upper()],
+                dtype=np.intp,
+            )
+        # one search over all texts, then map match offsets back to words
+        starts = np.cumsum(np.fromiter(map(len, self.texts), np.intp, len(self)) + 1)
+        hits = []
+        pos = upper.find(keyword)
+        while pos != -1:
+            hits.append(pos)
+            pos = upper.find(keyword, pos + 1)
+        return np.unique(np.searchsorted(starts, hits, side="right"))
+
+    def same_line(self, top: float, line_tol: float) -> np.ndarray:
+        return np.flatnonzero(np.abs(self.top - top) <= line_tol)
+
+    def line_counts(self, positions: np.ndarray, line_tol: float) -> np.ndarray:
+        """Number of words on the line of each word in `positions`."""
+        diff = np.abs(self.top[positions, np.newaxis] - self.top[np.newaxis, :])
+        return np.count_nonzero(diff <= line_tol, axis=1)
+
+    def below_right(
+        self, top: float, x0: float, height_tol: float, width_tol: float
+    ) -> np.ndarray:
+        """Words starting up to height_tol below `top` and ending up to width_tol right of `x0`."""
+        dy = self.top - top
+        dx = self.x1 - x0
+        return np.flatnonzero(
+            (dy >= 0) & (dy <= height_tol) & (dx >= 0) & (dx <= width_tol)
+        )
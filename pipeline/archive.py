@@ -0,0 +1,186 @@
+import os
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".gz")
+
+# uncompressed size of one PDF inside an archive; larger members fail unread
+DEFAULT_MAX_MEMBER_MB = float(os.environ.get("PDF2EXCEL_MAX_MEMBER_MB", "64"))
+
+# what damaged, encrypted (RuntimeError) or unsupported (NotImplementedError)
+# archives and members raise while being read
+_READ_ERRORS = (
+    zipfile.BadZipFile,
+    tarfile.TarError,
+    EOFError,
+    zlib.error,
+    RuntimeError,
+    NotImplementedError,
+    OSError,
+)
+
+
+class UnreadableFile(NamedTuple):
+    """
+    Yielded instead of the bytes of an archive member, or a whole archive,
+    that can't be read; process_files reports it as a failed file and the
+    batch goes on.
+    """
+
+    error: str
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_limit_bytes(max_member_mb: Optional[float]) -> Optional[int]:
+    """max_member_bytes of iter_archive_pdfs for a limit in MB; None or 0: no limit."""
+    return int(max_member_mb * 1024 * 1024) if max_member_mb else None
+
+
+def _is_pdf_member(path: str) -> bool:
+    name = os.path.basename(path)
+    # skip macOS resource forks ("__MACOSX/", "._name.pdf")
+    return (
+        name.lower().endswith(".pdf")
+        and not name.startswith("._")
+        and "__MACOSX/" not in path
+    )
+
+
+def iter_archive_pdfs(
+    fileobj: IO[bytes], name: str, max_member_bytes: Optional[int] = None
+) -> Iterator[Tuple[str, Union[bytes, UnreadableFile]]]:
+    """
+    Yield (member file name, PDF bytes) one member at a time.
+    Tar archives are read as a stream, zip members are decompressed on demand,
+    so only the current member is held in memory.
+    A member that can't be read is yielded as UnreadableFile; so is the
+    archive itself (under its own name) if it can't be opened, or if a tar
+    stream breaks off, after which no more members can be read.
+    Members larger than max_member_bytes once decompressed are not read but
+    yielded as UnreadableFile, so a small archive can't inflate into more
+    memory than that per member.
+    """
+    # paths given on the command line are reported by file name
+    name = os.path.basename(name)
+    if name.lower().endswith(".pdf.gz"):
+        # gzip compresses a single file, there are no members to read
+        yield name, UnreadableFile(
+            f"{name} is a gzip-compressed PDF, not an archive; decompress it or pack it in a ZIP/TAR"
+        )
+        return
+    if name.lower().endswith(".zip"):
+        yield from _iter_zip_pdfs(fileobj, name, max_member_bytes)
+    else:
+        yield from _iter_tar_pdfs(fileobj, name, max_member_bytes)
+
+
+def _too_large(path: str, name: str, size: int, max_member_bytes: Optional[int]):
+    if max_member_bytes is None or size <= max_member_bytes:
+        return None
+    return UnreadableFile(
+        f"{path} in archive {name} is {size} bytes uncompressed, over the limit of {max_member_bytes} bytes"
+    )
+
+
+def _iter_zip_pdfs(fileobj: IO[bytes], name: str, max_member_bytes: Optional[int]):
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except _READ_ERRORS as e:
+        yield name, UnreadableFile(f"Can not read archive {name}: {e}")
+        return
+    with zf:
+        for info in zf.infolist():
+            if info.is_dir() or not _is_pdf_member(info.filename):
+                continue
+            # zipfile never reads past file_size, so the header can be trusted
+            too_large = _too_large(
+                info.filename, name, info.file_size, max_member_bytes
+            )
+            if too_large is not None:
+                yield os.path.basename(info.filename), too_large
+                continue
+            try:
+                with zf.open(info) as member:
+                    data = member.read()
+            except _READ_ERRORS as e:
+                data = UnreadableFile(
+                    f"Can not read {info.filename} in archive {name}: {e}"
+                )
+            yield os.path.basename(info.filename), data
+
+
+def _iter_tar_pdfs(fileobj: IO[bytes], name: str, max_member_bytes: Optional[int]):
+    try:
+        tf = tarfile.open(fileobj=fileobj, mode="r|*")
+    except tarfile.ReadError as e:
+        # e.g. a gzipped file that is not a tar
+        yield name, UnreadableFile(f"{name} is not a TAR archive: {e}")
+        return
+    except _READ_ERRORS as e:
+        yield name, UnreadableFile(f"Can not read archive {name}: {e}")
+        return
+    with tf:
+        members = iter(tf)
+        while True:
+            try:
+                info = next(members, None)
+                if info is None:
+                    return
+                if not info.isfile() or not _is_pdf_member(info.name):
+                    continue
+                data = _too_large(info.name, name, info.size, max_member_bytes)
+                if data is None:
+                    data = tf.extractfile(info).read()
+            except _READ_ERRORS as e:
+                yield name, UnreadableFile(f"Can not read archive {name}: {e}")
+                return
+            yield os.path.basename(info.name), data
+
+
+def count_archive_pdfs(fileobj: IO[bytes], name: str) -> Optional[int]:
+    """Number of PDFs in a zip (from its directory); None for streamed tar archives."""
+    if not name.lower().endswith(".zip"):
+        return None
+    position = fileobj.tell()
+    try:
+        with zipfile.ZipFile(fileobj) as zf:
+            return sum(
+                1
+                for info in zf.infolist()
+                if not info.is_dir() and _is_pdf_member(info.filename)
+            )
+    except _READ_ERRORS:
+        return None
+    finally:
+        fileobj.seek(position)
+
+
+def iter_uploaded_pdfs(
+    uploads: Iterable, max_member_mb: Optional[float] = DEFAULT_MAX_MEMBER_MB
+) -> Iterator[Tuple[str, Union[bytes, UnreadableFile]]]:
+    """(name, bytes) for uploaded PDFs and for the PDFs inside uploaded archives."""
+    max_member_bytes = member_limit_bytes(max_member_mb)
+    for upload in uploads:
+        if is_archive(upload.name):
+            upload.seek(0)
+            yield from iter_archive_pdfs(upload, upload.name, max_member_bytes)
+        else:
+            yield upload.name, upload.getvalue()
+
+
+def count_uploaded_pdfs(uploads: Iterable) -> Optional[int]:
+    total = 0
+    for upload in uploads:
+        if is_archive(upload.name):
+            count = count_archive_pdfs(upload, upload.name)
+            if count is None:
+                return None
+            total += count
+        else:
+            total += 1
+    return total
@@ -0,0 +1,263 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from pipeline.ingest import AUTO_MODE, FILE_NAME_MARKERS, MODES, create_excel_writer
+from pipeline.records import ColumnarAccumulator
+from pipeline.startup import STARTUP
+from pipeline.store import RecordStore
+
+
+def id_columns(mode: str) -> List[str]:
+    return ["PO#"] if mode in ("Wholesale", "SK") else ["Kohler PO", "Kohler SKU"]
+
+
+def failure_message(result: Dict, mode: str) -> Optional[str]:
+    name = result["name"]
+    file_type = result["file_type"]
+    status = result["status"]
+    if status == "skipped" and mode == AUTO_MODE:
+        return f"⚠️ Warning: PDF {name} was not recognized as a Wholesale, SK or Retail purchase order, skipped."
+    if status == "skipped":
+        return f"⚠️ Warning: PDF {name} seems not a valid file type in mode {mode}, skipped."
+    if status == "ambiguous":
+        return f"⚠️ Warning: PDF {name} is a Wholesale or SK purchase order, but its name has neither the {FILE_NAME_MARKERS['Wholesale']} nor the {FILE_NAME_MARKERS['SK']} marker, skipped."
+    if status == "unreadable":
+        return f"⚠️ Warning: Failed to read {name} -> {result['error']}"
+    if status == "open_failed":
+        return f"⚠️ Warning: Failed to open/parse PDF: {name} -> {result['error']}"
+    if status == "memory_limit":
+        return f"⚠️ Warning: PDF {name} exceeded the per-document memory limit -> {result['error']}"
+    if status == "parse_failed":
+        return f"⚠️ Warning: Can not parse/extract information from this PDF file: {name}, file type: {file_type}"
+    if status == "missing_keys":
+        return f"⚠️ Warning: PDF {name} (file type: {file_type}) missing columns: {result['missing_keys']}, skipped."
+    return None
+
+
+def file_stat(result: Dict) -> Dict:
+    """Per-file row of the run statistics."""
+    return {
+        "file": result["name"],
+        "status": result["status"],
+        "file_type": result["file_type"],
+        "pages": result["pages"],
+        "rows": len(result["po_info"]),
+        "cached": result["cached"],
+        "memory (MB)": round(result["memory_mb"], 1),
+        **{f"{stage} (s)": t for stage, t in result["timings"].items()},
+    }
+
+
+def failure_record(result: Dict) -> Dict:
+    return {
+        "name": result["name"],
+        "status": result["status"],
+        "file_type": result["file_type"],
+        "error": result["error"],
+        "missing_keys": result["missing_keys"],
+    }
+
+
+class BatchCollector:
+    """
+    Collects process_file results of one run and builds the report DataFrame.
+    Shared by the Streamlit app and the CLI.
+    With a store, parsed rows are also upserted into it and the report is
+    built from everything stored so far (incremental runs).
+    """
+
+    def __init__(self, mode: str, store: Optional[RecordStore] = None):
+        self.mode = mode
+        self.store = store
+        writer = create_excel_writer(mode)
+        self.required_keys = writer.output_schema
+        # parsed rows, kept column-wise and typed
+        self.original_rows = ColumnarAccumulator(writer)
+        self.revised_rows = ColumnarAccumulator(writer)
+        self.original_files = []
+        self.revised_files = []
+        self.failed_files = []
+        # files skipped because the store already has them
+        self.known_files = []
+        self.failures = []
+        self.file_stats = []
+
+    def new_files(
+        self, files: Iterable[Tuple[str, bytes]]
+    ) -> Iterable[Tuple[str, bytes]]:
+        """Drop files the store already has, for incremental runs."""
+        if self.store is None:
+            return files
+        return self.store.filter_new(files, self.mode, self.known_files)
+
+    def add(self, result: Dict) -> Optional[str]:
+        """Add one result, returns a warning message if the file failed."""
+        self.file_stats.append(file_stat(result))
+        message = failure_message(result, self.mode)
+        if message is not None:
+            self.failed_files.append(result["name"])
+            self.failures.append(failure_record(result))
+            return message
+
+        STARTUP.mark("first parsed file")
+        if result["file_type"] == "revised":
+            self.revised_rows.extend_rows(result["po_info"])
+            self.revised_files.append(result["name"])
+        else:
+            self.original_rows.extend_rows(result["po_info"])
+            self.original_files.append(result["name"])
+        if self.store is not None:
+            self.store.upsert(
+                self.mode,
+                id_columns(self.mode),
+                result["digest"],
+                result["name"],
+                result["file_type"],
+                result["po_info"],
+            )
+        return None
+
+    @property
+    def file_info(self) -> Dict:
+        return {
+            "original_files": self.original_files,
+            "revised_files": self.revised_files,
+            "failed_files": self.failed_files,
+            "known_files": self.known_files,
+        }
+
+    def to_dataframe(self) -> Optional[pd.DataFrame]:
+        """Revised rows override original ones; None if nothing was parsed."""
+        if self.store is not None:
+            return self.store.to_dataframe(self.mode, id_columns(self.mode)[0])
+        if not (len(self.original_rows) or len(self.revised_rows)):
+            return None
+
+        original_df = self.original_rows.to_dataframe()
+        if len(self.revised_rows):
+            original_df = pd.concat(
+                [original_df, self.revised_rows.to_dataframe()], ignore_index=True
+            )
+        id_cols = id_columns(self.mode)
+        return (
+            original_df.drop_duplicates(subset=id_cols, keep="last")
+            .sort_values(id_cols[0], kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def to_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """{mode: report}, as MixedBatchCollector returns it; empty if nothing was parsed."""
+        df = self.to_dataframe()
+        return {} if df is None else {self.mode: df}
+
+    def preview(self, n: int = 5) -> pd.DataFrame:
+        """First n rows parsed so far, before dedup/sort."""
+        preview = self.original_rows.to_dataframe(n)
+        if len(preview) < n and len(self.revised_rows):
+            preview = pd.concat(
+                [preview, self.revised_rows.to_dataframe(n - len(preview))],
+                ignore_index=True,
+            )
+        return preview
+
+
+class MixedBatchCollector:
+    """
+    Collects the results of an AUTO_MODE run: every file goes to the
+    BatchCollector of the mode it was detected as, so a single run gives one
+    report per order type. Files not recognized as a PO, Wholesale/SK orders
+    that can't be told apart and unreadable archive members are kept here.
+    Offers the counters of BatchCollector, summed over the modes.
+    """
+
+    mode = AUTO_MODE
+
+    def __init__(self, store: Optional[RecordStore] = None):
+        self.store = store
+        self.collectors: Dict[str, BatchCollector] = {}
+        self.unrecognized_files = []
+        self.known_files = []
+        self.file_stats = []
+        self._failures = []
+
+    def collector_for(self, mode: str) -> BatchCollector:
+        if mode not in self.collectors:
+            self.collectors[mode] = BatchCollector(mode, store=self.store)
+        return self.collectors[mode]
+
+    def new_files(
+        self, files: Iterable[Tuple[str, bytes]]
+    ) -> Iterable[Tuple[str, bytes]]:
+        """Drop files the store already has in any mode, for incremental runs."""
+        if self.store is None:
+            return files
+        return self.store.filter_new(files, None, self.known_files)
+
+    def add(self, result: Dict) -> Optional[str]:
+        """Add one result, returns a warning message if the file failed."""
+        if result["mode"] is None:
+            self.file_stats.append(file_stat(result))
+            message = failure_message(result, self.mode)
+            if message is not None:
+                self.unrecognized_files.append(result["name"])
+                self._failures.append(failure_record(result))
+            return message
+        collector = self.collector_for(result["mode"])
+        message = collector.add(result)
+        self.file_stats.append(dict(collector.file_stats[-1], mode=result["mode"]))
+        return message
+
+    def _summed(self, attr: str) -> List:
+        return [item for c in self.collectors.values() for item in getattr(c, attr)]
+
+    @property
+    def original_files(self) -> List[str]:
+        return self._summed("original_files")
+
+    @property
+    def revised_files(self) -> List[str]:
+        return self._summed("revised_files")
+
+    @property
+    def failed_files(self) -> List[str]:
+        return self.unrecognized_files + self._summed("failed_files")
+
+    @property
+    def failures(self) -> List[Dict]:
+        return self._failures + self._summed("failures")
+
+    @property
+    def file_info(self) -> Dict:
+        return {
+            "original_files": self.original_files,
+            "revised_files": self.revised_files,
+            "failed_files": self.failed_files,
+            "known_files": self.known_files,
+        }
+
+    def to_dataframes(self) -> Dict[str, pd.DataFrame]:
+        """Report DataFrame per detected mode, in MODES order; modes without rows are left out."""
+        reports = {}
+        for mode in MODES:
+            # with a store, modes without new files still have a report
+            if mode in self.collectors or self.store is not None:
+                df = self.collector_for(mode).to_dataframe()
+                if df is not None:
+                    reports[mode] = df
+        return reports
+
+    def preview(self, n: int = 5) -> pd.DataFrame:
+        """First rows of the first mode that has any (modes have different columns)."""
+        for collector in self.collectors.values():
+            preview = collector.preview(n)
+            if not preview.empty:
+                return preview
+        return pd.DataFrame()
+
+
+def create_collector(mode: str, store: Optional[RecordStore] = None):
+    """BatchCollector for a mode, MixedBatchCollector for AUTO_MODE."""
+    if mode == AUTO_MODE:
+        return MixedBatchCollector(store=store)
+    return BatchCollector(mode, store=store)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PDF2EXCEL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pdf2excel"),
+)
+DEFAULT_CACHE_MAX_MB = int(os.environ.get("PDF2EXCEL_CACHE_MAX_MB", "256"))
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Disk cache of extraction/parse results, keyed by PDF content hash plus
+    parser name and version. Entries are pickled dicts with keys
+    'full_text', 'words', 'po_info' and 'file_type'.
+    Least recently used entries (by mtime) are evicted once the cache
+    directory grows over max_bytes.
+    """
+
+    SUFFIX = ".pkl"
+
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_mb: int = DEFAULT_CACHE_MAX_MB
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+
+    def make_key(self, digest: str, mode: str, parser_name: str, version: str) -> str:
+        raw = f"{digest}|{mode}|{parser_name}|{version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temp file first so concurrent workers never read partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(self.SUFFIX):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.SUFFIX):
+                os.remove(os.path.join(self.cache_dir, name))
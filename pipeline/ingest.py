@@ -0,0 +1,606 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from io import BytesIO
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_parser.classifier import AMBIGUOUS, CLASSIFIER_VERSION, classify_po
+from pdf_parser.template import ANCHORS, PATTERNS, POParser
+from pipeline.archive import UnreadableFile
+from pipeline.cache import ExtractionCache, file_digest
+from pipeline.memo import MemoCache
+from pipeline.memory import MemoryGuard, MemoryLimitExceeded
+from pipeline.timing import StageTimer
+from text_extractor.template import TextExtractor
+
+if TYPE_CHECKING:
+    from excel_writer.template import ExcelWriter
+
+MODES = ["Wholesale", "Retail", "SK"]
+
+# Detect the mode of each file from its first page instead (see classify_po);
+# one run then produces a report per detected mode
+AUTO_MODE = "Auto"
+
+# Files whose name does not contain the marker of the selected mode are skipped
+FILE_NAME_MARKERS = {"Wholesale": "KP", "Retail": "DI", "SK": "SK"}
+
+REVISED_MARKER = (
+    "This Purchase Order has been changed. Specific changes are shown in red."
+)
+
+EXTRACTORS = ["pdfplumber", "pdfium"]
+
+# pdfplumber is the reference backend the parsers were written against;
+# switch a mode to "pdfium" once run_conformance passes on its documents
+DEFAULT_EXTRACTORS = {
+    "Wholesale": "pdfplumber",
+    "Retail": "pdfplumber",
+    "SK": "pdfplumber",
+    # before the first page is read the mode is unknown
+    AUTO_MODE: "pdfplumber",
+}
+
+# Wholesale/SK read a single header + first item, so with early_stop only
+# the pages up to where every output field is found, and the parser's
+# per-document settings are final, are extracted
+EARLY_STOP_MODES = ("Wholesale", "SK")
+# part of the cache key of early-stopped results, bump when the stop rule changes
+EARLY_STOP_VERSION = "2"
+# lines the header + first item can't be parsed without; pages are scanned
+# for them before the text read so far is parsed
+_EARLY_STOP_ANCHORS = (ANCHORS["info"], ANCHORS["delivery_requested_date"])
+# full parses tried once the anchors are in: the first item's description may
+# wrap onto the next page; documents still incomplete are read to the end
+_EARLY_STOP_PARSES = 2
+
+# Parsers and extractors are created once per mode/name in each worker process
+_parsers: Dict[str, POParser] = {}
+_extractors: Dict[str, TextExtractor] = {}
+
+# The factories import parsers, writers and backends on first use: numpy,
+# pandas, openpyxl and pdfplumber are only loaded by the processes that need
+# them, so importing this module (e.g. for the UI's constants) stays cheap.
+
+
+def create_parser(mode: str) -> POParser:
+    if mode == "Wholesale":
+        from pdf_parser.wholesale_parser import WholesalePOParser
+
+        return WholesalePOParser()
+    if mode == "SK":
+        from pdf_parser.sk_parser import SKPOParser
+
+        return SKPOParser()
+    if mode == "Retail":
+        from pdf_parser.retail_parser import RetailPOParser
+
+        return RetailPOParser()
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def create_excel_writer(mode: str) -> "ExcelWriter":
+    if mode in ("Wholesale", "SK"):
+        from excel_writer.wholesale import WholesaleExcelWriter
+
+        return WholesaleExcelWriter()
+    if mode == "Retail":
+        from excel_writer.retail import RetailExcelWriter
+
+        return RetailExcelWriter()
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def mode_from_name(name: str) -> Optional[str]:
+    """The mode whose FILE_NAME_MARKERS entry the file name contains, if any."""
+    for mode in MODES:
+        if FILE_NAME_MARKERS[mode] in name:
+            return mode
+    return None
+
+
+def _get_parser(mode: str) -> POParser:
+    if mode not in _parsers:
+        _parsers[mode] = create_parser(mode)
+    return _parsers[mode]
+
+
+def create_extractor(name: str) -> TextExtractor:
+    if name == "pdfplumber":
+        from text_extractor.pdfplumber_extractor import PdfplumberExtractor
+
+        return PdfplumberExtractor()
+    if name == "pdfium":
+        from text_extractor.pdfium_extractor import PdfiumExtractor
+
+        return PdfiumExtractor()
+    raise ValueError(f"Unknown extractor: {name}")
+
+
+def _get_extractor(name: str) -> TextExtractor:
+    if name not in _extractors:
+        _extractors[name] = create_extractor(name)
+    return _extractors[name]
+
+
+def warm_up(modes: Iterable[str] = MODES, extractors: Iterable[str] = ()) -> int:
+    """
+    Import and create the parsers, writers and extraction backends of `modes`
+    (plus `extractors`) now rather than on the first file. Used as the
+    initializer of pre-warmed worker processes; returns the process id.
+    """
+    for mode in modes:
+        _get_parser(mode)
+        create_excel_writer(mode)
+        _get_extractor(DEFAULT_EXTRACTORS[mode])
+    for name in extractors:
+        _get_extractor(name)
+    return os.getpid()
+
+
+def extract_pdf(
+    source,
+    mode: str,
+    memory_guard: Optional[MemoryGuard] = None,
+    extractor: Optional[str] = None,
+) -> Tuple[str, Optional[List[Dict]], int]:
+    """Return (full_text, page-0 words for Retail, page count)."""
+    backend = _get_extractor(extractor or DEFAULT_EXTRACTORS[mode])
+    return backend.extract(source, mode, memory_guard=memory_guard)
+
+
+def extract_until_complete(
+    source,
+    mode: str,
+    memory_guard: Optional[MemoryGuard] = None,
+    extractor: Optional[str] = None,
+) -> Tuple[str, Optional[List[Dict]], int]:
+    """
+    Like extract_pdf, but stops after the first page at which parsing the text
+    read so far fills every output_schema field. Documents that never get
+    complete are read to the end, so they parse exactly like the full text.
+    """
+    backend = _get_extractor(extractor or DEFAULT_EXTRACTORS[mode])
+    check = _CompletenessCheck(mode)
+    texts = []
+    pages = backend.iter_pages(source, mode, memory_guard=memory_guard)
+    try:
+        for text, _ in pages:
+            texts.append(text)
+            if check.is_complete(texts):
+                break
+    finally:
+        pages.close()
+    return TextExtractor.join_pages(texts), None, len(texts)
+
+
+class _CompletenessCheck:
+    """
+    Early-stop test, called after each page is appended to `texts`: whether
+    the pages read so far already parse into every output_schema field, with
+    settings that no later page can change. The revised marker is part of the
+    header, so it has been read once the header fields are found.
+    Each new page is only scanned for the PO id, _EARLY_STOP_ANCHORS and
+    context_is_final; the text read so far is parsed once all of them have
+    been seen, at most _EARLY_STOP_PARSES times, rather than after every page.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.parser = _get_parser(mode)
+        self.required_keys = create_excel_writer(mode).output_schema
+        self.has_po_id = False
+        self.anchors_seen = set()
+        self.context_final = False
+        self.parses = 0
+
+    def is_complete(self, texts: List[str]) -> bool:
+        page = texts[-1] or ""
+        if not self.has_po_id:
+            self.has_po_id = PATTERNS["po_id"].search(page) is not None
+        self.anchors_seen.update(a for a in _EARLY_STOP_ANCHORS if a in page)
+        if not self.context_final:
+            self.context_final = self.parser.context_is_final(page)
+        if not (
+            self.has_po_id
+            and self.context_final
+            and len(self.anchors_seen) == len(_EARLY_STOP_ANCHORS)
+            and self.parses < _EARLY_STOP_PARSES
+        ):
+            return False
+        self.parses += 1
+        try:
+            _, po_info = parse_document(self.mode, TextExtractor.join_pages(texts))
+        except Exception:
+            return False
+        return bool(po_info) and all(k in po_info[0] for k in self.required_keys)
+
+
+def extract_classified(
+    source,
+    name_hint: Optional[str] = None,
+    memory_guard: Optional[MemoryGuard] = None,
+    extractor: Optional[str] = None,
+    early_stop: bool = False,
+) -> Tuple[Optional[str], str, Optional[List[Dict]], int]:
+    """
+    Extraction for AUTO_MODE: classify_po on the first page, then the rest of
+    the document is read as extract_pdf (extract_until_complete with
+    early_stop) reads it for the detected mode, in the same pass.
+    Returns (mode, full_text, page-0 words for Retail, page count); mode is
+    None if the document is not a PO and AMBIGUOUS if it can't be told whether
+    it is a Wholesale or an SK one; nothing after page 1 is read then.
+    """
+    backend = _get_extractor(extractor or DEFAULT_EXTRACTORS[AUTO_MODE])
+    mode = None
+    words = None
+    check = None
+    texts = []
+    # page 0's words too, in case the document turns out to be Retail
+    pages = backend.iter_pages(source, "Retail", memory_guard=memory_guard)
+    try:
+        for text, page_words in pages:
+            texts.append(text)
+            if len(texts) == 1:
+                mode = classify_po(text or "", name_hint)
+                if mode is None or mode == AMBIGUOUS:
+                    break
+                if mode == "Retail":
+                    words = page_words
+                early_stop = early_stop and mode in EARLY_STOP_MODES
+                if early_stop:
+                    check = _CompletenessCheck(mode)
+            if early_stop and check.is_complete(texts):
+                break
+    finally:
+        pages.close()
+    return mode, TextExtractor.join_pages(texts), words, len(texts)
+
+
+def new_result(name: str, status: str = "skipped") -> Dict:
+    """Result dict as returned by process_file."""
+    return {
+        "name": name,
+        # mode the file was parsed in (the detected one in AUTO_MODE)
+        "mode": None,
+        "digest": None,
+        "status": status,
+        "file_type": "original",
+        "po_info": [],
+        "missing_keys": [],
+        "error": None,
+        "cached": False,
+        "pages": 0,
+        "memory_mb": 0.0,
+        "timings": {},
+    }
+
+
+def detect_file_type(full_text: str) -> str:
+    return "revised" if REVISED_MARKER in full_text else "original"
+
+
+def parse_document(
+    mode: str, full_text: str, words: Optional[List[Dict]] = None
+) -> Tuple[str, List[Dict]]:
+    """Return (file_type, po_info) for an extracted document."""
+    file_type = detect_file_type(full_text)
+    po_parser = _get_parser(mode)
+    context = po_parser.context_for(full_text, file_type=file_type)
+    po_info = po_parser.parse_po_content(full_text, context, words=words)
+    return file_type, po_info or []
+
+
+def _extract_and_parse(
+    data: bytes,
+    mode: str,
+    timer: StageTimer,
+    memory_guard: MemoryGuard,
+    extractor: str,
+    early_stop: bool = False,
+    name_hint: Optional[str] = None,
+) -> Dict:
+    with timer.stage("extract"):
+        if mode == AUTO_MODE:
+            mode, full_text, words, page_count = extract_classified(
+                BytesIO(data),
+                name_hint,
+                memory_guard=memory_guard,
+                extractor=extractor,
+                early_stop=early_stop,
+            )
+        else:
+            extract = extract_until_complete if early_stop else extract_pdf
+            full_text, words, page_count = extract(
+                BytesIO(data), mode, memory_guard=memory_guard, extractor=extractor
+            )
+        if words is not None:
+            from pdf_parser.word_index import WordIndex
+
+            # compact word geometry: what gets cached and what the Ship-To lookup uses
+            words = WordIndex(words)
+    entry = {
+        "mode": mode,
+        "full_text": full_text,
+        "words": words,
+        "pages": page_count,
+        "file_type": detect_file_type(full_text),
+        "po_info": [],
+        "error": None,
+    }
+    if mode is None or mode == AMBIGUOUS:
+        # not a PO, or not known which parser it needs: nothing to parse
+        return entry
+    with timer.stage("parse"):
+        try:
+            _, entry["po_info"] = parse_document(mode, full_text, words)
+        except Exception as e:
+            entry["error"] = str(e)
+    return entry
+
+
+def _modes_of(mode: str) -> List[str]:
+    """The modes a run in `mode` may parse files in."""
+    return MODES if mode == AUTO_MODE else [mode]
+
+
+def _uses_early_stop(mode: str, early_stop: bool) -> bool:
+    return early_stop and (mode in EARLY_STOP_MODES or mode == AUTO_MODE)
+
+
+def _result_version(
+    mode: str, extractor: str, early_stop: bool, name_hint: Optional[str] = None
+) -> str:
+    """Everything besides the PDF content that changes an extraction/parse result."""
+    parser_version = "-".join(_get_parser(m).version for m in _modes_of(mode))
+    backend = _get_extractor(extractor)
+    version = f"{parser_version}-{backend.name}-{backend.version}"
+    if mode == AUTO_MODE:
+        # the file name can decide between Wholesale and SK
+        version += f"-auto{CLASSIFIER_VERSION}-{name_hint}"
+    return version + (f"-early-stop{EARLY_STOP_VERSION}" if early_stop else "")
+
+
+def result_memo_key(
+    digest: str,
+    mode: str,
+    extractor: Optional[str] = None,
+    early_stop: bool = False,
+    name_hint: Optional[str] = None,
+) -> Tuple:
+    """MemoCache key of a process_file result; includes the output schema checked."""
+    extractor = extractor or DEFAULT_EXTRACTORS[mode]
+    early_stop = _uses_early_stop(mode, early_stop)
+    return (
+        "result",
+        digest,
+        mode,
+        _result_version(mode, extractor, early_stop, name_hint),
+        tuple(tuple(create_excel_writer(m).output_schema) for m in _modes_of(mode)),
+    )
+
+
+def process_file(
+    name: str,
+    data: bytes,
+    mode: str,
+    digest: Optional[str] = None,
+    cache: Optional[ExtractionCache] = None,
+    memory_limit_mb: Optional[float] = None,
+    extractor: Optional[str] = None,
+    early_stop: bool = False,
+) -> Dict:
+    """
+    Extract and parse one PDF. Runs inside a worker process, so everything
+    needed by the caller is returned in a picklable dict:
+        status: "ok", "skipped", "ambiguous", "open_failed", "memory_limit",
+                "parse_failed" or "missing_keys"
+    In AUTO_MODE the file name is only a hint and result["mode"] is the
+    detected mode; files that are not recognized as a PO are "skipped",
+    Wholesale/SK orders whose name has neither marker "ambiguous" (mode None).
+    """
+    name_hint = None
+    if mode == AUTO_MODE:
+        name_hint = mode_from_name(name)
+    elif FILE_NAME_MARKERS[mode] not in name:
+        return new_result(name)
+
+    result = new_result(name, status="ok")
+    result["digest"] = digest = digest or file_digest(data)
+    timer = StageTimer()
+    result["timings"] = timer.timings
+    extractor = extractor or DEFAULT_EXTRACTORS[mode]
+    early_stop = _uses_early_stop(mode, early_stop)
+
+    entry = None
+    if cache is not None:
+        key = cache.make_key(
+            digest,
+            mode,
+            "auto" if mode == AUTO_MODE else type(_get_parser(mode)).__name__,
+            _result_version(mode, extractor, early_stop, name_hint),
+        )
+        with timer.stage("cache"):
+            entry = cache.get(key)
+        result["cached"] = entry is not None
+
+    if entry is None:
+        memory_guard = MemoryGuard(memory_limit_mb)
+        try:
+            entry = _extract_and_parse(
+                data, mode, timer, memory_guard, extractor, early_stop, name_hint
+            )
+        except MemoryLimitExceeded as e:
+            result["status"] = "memory_limit"
+            result["error"] = str(e)
+            result["memory_mb"] = memory_guard.peak_mb
+            return result
+        except Exception as e:
+            result["status"] = "open_failed"
+            result["error"] = str(e)
+            return result
+        result["memory_mb"] = memory_guard.peak_mb
+        if cache is not None:
+            with timer.stage("cache"):
+                cache.put(key, entry)
+
+    result["file_type"] = entry["file_type"]
+    result["pages"] = entry.get("pages", 0)
+    result["mode"] = mode = entry.get("mode", mode)
+    if mode == AMBIGUOUS:
+        result["mode"] = None
+        result["status"] = "ambiguous"
+        return result
+    if mode is None:
+        result["status"] = "skipped"
+        return result
+    if entry["error"] is not None or not entry["po_info"]:
+        result["status"] = "parse_failed"
+        result["error"] = entry["error"]
+        return result
+
+    po_info = entry["po_info"]
+    required_keys = create_excel_writer(mode).output_schema
+    missing_keys = [k for k in required_keys if k not in po_info[0]]
+    if missing_keys:
+        result["status"] = "missing_keys"
+        result["missing_keys"] = missing_keys
+        return result
+
+    result["po_info"] = po_info
+    return result
+
+
+class _InlineExecutor:
+    """Executor stand-in that runs submitted calls immediately, for max_workers=1."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def process_files(
+    files: Iterable[Tuple[str, bytes]],
+    mode: str,
+    max_workers: Optional[int] = None,
+    cache: Optional[ExtractionCache] = None,
+    memory_limit_mb: Optional[float] = None,
+    extractor: Optional[str] = None,
+    early_stop: bool = False,
+    memo: Optional[MemoCache] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[Dict]:
+    """
+    Run process_file over (name, data) pairs on a process pool.
+    Archive members that could not be read (UnreadableFile) give an
+    "unreadable" result without being submitted.
+    Results are yielded in input order, so later (revised) files still win
+    when duplicates are dropped with keep="last".
+    Files with identical content are only extracted and parsed once per batch,
+    and with a memo only once per process: results found there are not
+    submitted at all.
+    A running executor (e.g. a pre-warmed WorkerPool's) is used as is and
+    left running; otherwise a pool of max_workers is started for this call.
+    With max_workers=1 files run in the calling process, unless there is a
+    memory limit.
+    """
+    if max_workers is None:
+        max_workers = default_workers()
+
+    if executor is not None:
+        owned = nullcontext()
+    elif max_workers <= 1 and not memory_limit_mb:
+        executor = owned = _InlineExecutor()
+    else:
+        # a memory limit is checked against a worker's own RSS: inline, it
+        # would measure the caller (e.g. the app server shared by every session)
+        executor = owned = ProcessPoolExecutor(
+            max_workers=max(max_workers, 1), mp_context=get_context("spawn")
+        )
+
+    # keep a bounded window of submitted files so inputs are not all held at once
+    window = max_workers * 2
+    seen: Dict[Tuple[str, Optional[str]], Future] = {}
+    with owned:
+        pending = deque()
+        try:
+            for name, data in files:
+                if isinstance(data, UnreadableFile):
+                    result = new_result(name, status="unreadable")
+                    result["error"] = data.error
+                    future = Future()
+                    future.set_result(result)
+                elif mode != AUTO_MODE and FILE_NAME_MARKERS[mode] not in name:
+                    future = Future()
+                    future.set_result(new_result(name))
+                else:
+                    digest = file_digest(data)
+                    name_hint = mode_from_name(name) if mode == AUTO_MODE else None
+                    # in AUTO_MODE the name can change the result, not just the content
+                    seen_key = (digest, name_hint)
+                    future = seen.get(seen_key)
+                    memo_key = None
+                    if future is None and memo is not None:
+                        memo_key = result_memo_key(
+                            digest, mode, extractor, early_stop, name_hint
+                        )
+                        hit = memo.get(memo_key)
+                        if hit is not None:
+                            future = Future()
+                            future.set_result(dict(hit, cached=True, timings={}))
+                            seen[seen_key] = future
+                    if future is None:
+                        future = executor.submit(
+                            process_file,
+                            name,
+                            data,
+                            mode,
+                            digest,
+                            cache,
+                            memory_limit_mb,
+                            extractor,
+                            early_stop,
+                        )
+                        if memo_key is not None:
+                            future.add_done_callback(partial(_memoize, memo, memo_key))
+                        seen[seen_key] = future
+                pending.append((name, future))
+                if len(pending) >= window:
+                    yield _result_for(*pending.popleft())
+            while pending:
+                yield _result_for(*pending.popleft())
+        finally:
+            # the consumer stopped early (e.g. a cancelled run): drop queued files
+            for _, future in pending:
+                future.cancel()
+
+
+def _memoize(memo: MemoCache, key: Tuple, future: Future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    # depends on the memory limit of this run, not only on the content
+    if result["status"] != "memory_limit":
+        memo.put(key, result)
+
+
+def _result_for(name: str, future: Future) -> Dict:
+    result = future.result()
+    if result["name"] != name:
+        # same content uploaded under another name
+        result = dict(result, name=name)
+    return result
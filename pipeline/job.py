@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from pipeline.batch import create_collector
+from pipeline.cache import ExtractionCache
+from pipeline.ingest import process_files
+from pipeline.memo import MemoCache
+from pipeline.store import RecordStore
+from pipeline.timing import StageTimer
+
+
+class BatchJob:
+    """
+    Runs process_files on a background thread so a UI can poll progress.
+    Results are added to `collector` as each file finishes (in input order);
+    cancel() stops the run and keeps everything collected so far.
+    `total` is the expected number of files, None if unknown.
+    With a store and incremental=True, files already in the store are skipped.
+    """
+
+    def __init__(
+        self,
+        files: Iterable[Tuple[str, bytes]],
+        mode: str,
+        total: Optional[int],
+        max_workers: Optional[int] = None,
+        cache: Optional[ExtractionCache] = None,
+        memory_limit_mb: Optional[float] = None,
+        store: Optional[RecordStore] = None,
+        incremental: bool = False,
+        extractor: Optional[str] = None,
+        early_stop: bool = False,
+        memo: Optional[MemoCache] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.mode = mode
+        self.total = total
+        self.collector = create_collector(mode, store=store)
+        self.timer = StageTimer()
+        self.messages: List[str] = []
+        self.error: Optional[str] = None
+        self._files = self.collector.new_files(files) if incremental else files
+        self._max_workers = max_workers
+        self._cache = cache
+        self._memory_limit_mb = memory_limit_mb
+        self._extractor = extractor
+        self._early_stop = early_stop
+        self._memo = memo
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self):
+        results = process_files(
+            self._files,
+            self.mode,
+            max_workers=self._max_workers,
+            cache=self._cache,
+            memory_limit_mb=self._memory_limit_mb,
+            extractor=self._extractor,
+            early_stop=self._early_stop,
+            memo=self._memo,
+            executor=self._executor,
+        )
+        try:
+            with self.timer.stage("extract + parse (wall)"):
+                for result in results:
+                    with self._lock:
+                        message = self.collector.add(result)
+                        if message:
+                            self.messages.append(message)
+                    if self._cancel.is_set():
+                        break
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            results.close()
+            self._done.set()
+
+    def progress(self) -> Dict:
+        with self._lock:
+            parsed = len(self.collector.original_files) + len(
+                self.collector.revised_files
+            )
+            failed = len(self.collector.failed_files)
+            known = len(self.collector.known_files)
+        return {
+            "processed": parsed + failed + known,
+            "parsed": parsed,
+            "failed": failed,
+            "known": known,
+            "total": self.total,
+        }
+
+    def preview(self, n: int = 5) -> Optional[pd.DataFrame]:
+        """First rows parsed so far, before dedup/sort."""
+        with self._lock:
+            preview = self.collector.preview(n)
+        if preview.empty:
+            return None
+        return preview
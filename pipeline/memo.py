@@ -0,0 +1,87 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_MEMO_MAX_MB = int(os.environ.get("PDF2EXCEL_MEMO_MAX_MB", "256"))
+
+
+def frame_digest(df: "pd.DataFrame") -> str:
+    """Content hash of a DataFrame: values, index, column names and dtypes."""
+    import pandas as pd
+
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+class MemoCache:
+    """
+    In-memory LRU of computed values, bounded by the approximate total size of
+    the entries. Meant to be created once per server process (the app holds
+    it in st.cache_resource) and shared by all sessions and threads, so
+    entries must be treated as read-only.
+    Sizes are len() for bytes and the pickled size for anything else.
+    """
+
+    def __init__(self, max_mb: float = DEFAULT_MEMO_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def size_of(value: Any) -> int:
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        if size is None:
+            size = self.size_of(value)
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
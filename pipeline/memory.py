@@ -0,0 +1,45 @@
+import os
+import resource
+import sys
+from typing import Optional
+
+DEFAULT_DOC_MEMORY_MB = float(os.environ.get("PDF2EXCEL_DOC_MEMORY_MB", "0"))
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # no procfs: fall back to the peak RSS (bytes on macOS, KB elsewhere)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class MemoryGuard:
+    """
+    Tracks how much the process RSS grew while one document is extracted.
+    check() raises MemoryLimitExceeded once the growth passes limit_mb
+    (no limit when limit_mb is None or 0).
+    Meant for worker processes, where only one document is extracted at a
+    time; process_files never runs limited files in the calling process.
+    """
+
+    def __init__(self, limit_mb: Optional[float] = None):
+        self.limit_mb = limit_mb
+        self.baseline_mb = current_rss_mb()
+        self.peak_mb = 0.0
+
+    def check(self, where: str = ""):
+        used_mb = max(current_rss_mb() - self.baseline_mb, 0.0)
+        self.peak_mb = max(self.peak_mb, used_mb)
+        if self.limit_mb and used_mb > self.limit_mb:
+            raise MemoryLimitExceeded(
+                f"document used {used_mb:.0f} MB {where}, limit is {self.limit_mb:g} MB"
+            )
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterable, List
+
+from pipeline.ingest import MODES, warm_up
+from pipeline.startup import STARTUP
+
+# Size of the app's pre-warmed worker pool, 0 = off (a fresh pool per run)
+DEFAULT_PREWARM_WORKERS = int(os.environ.get("PDF2EXCEL_PREWARM_WORKERS", "0"))
+
+
+class WorkerPool:
+    """
+    Long-lived process pool for process_files whose workers import the
+    parsers, writers and extraction backends as soon as they start, so
+    neither the first file nor the first run pays for spawning processes
+    and importing pdfplumber/pandas/openpyxl.
+    Workers are started in the background by the constructor; `ready` tells
+    whether all of them have warmed up, `failed` whether a worker could not
+    start (callers should then fall back to a pool per run).
+    """
+
+    def __init__(self, max_workers: int, modes: Iterable[str] = MODES):
+        self.max_workers = max_workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=get_context("spawn"),
+            initializer=warm_up,
+            initargs=(tuple(modes),),
+        )
+        # one call per worker makes the pool start all of them now
+        self._warm: List[Future] = [
+            self.executor.submit(os.getpid) for _ in range(max_workers)
+        ]
+        for future in self._warm:
+            future.add_done_callback(self._on_warm)
+
+    def _on_warm(self, future: Future):
+        if self.ready:
+            STARTUP.mark("workers ready")
+
+    @property
+    def ready(self) -> bool:
+        return all(future.done() for future in self._warm) and not self.failed
+
+    @property
+    def failed(self) -> bool:
+        return any(
+            future.done() and future.exception() is not None for future in self._warm
+        )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
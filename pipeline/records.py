@@ -0,0 +1,109 @@
+from array import array
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from excel_writer.template import ExcelWriter
+
+
+def column_kinds(writer: "ExcelWriter") -> List[type]:
+    """Value type of each output_schema column, as writer.prepare_frame types it."""
+    kinds = []
+    for column in writer.output_schema:
+        if column in writer.date_columns:
+            kinds.append(datetime)
+        elif column in writer.number_columns:
+            kinds.append(int if writer.number_format(column) == "0" else float)
+        else:
+            kinds.append(str)
+    return kinds
+
+
+class ColumnarAccumulator:
+    """
+    Typed column buffers for the output_schema of one writer (column_kinds):
+    ints and floats go straight into arrays, dates and texts into lists.
+    to_dataframe() wraps the buffers as typed columns (Int64, float64,
+    datetime64, object), so no row dicts are built and nothing is re-typed
+    afterwards.
+    Parsers only guarantee the keys of a document's first row, so a missing
+    value becomes NA (a masked Int64, NaN, NaT or None), as the row dicts
+    used to give.
+    """
+
+    def __init__(self, writer: "ExcelWriter"):
+        self.columns = list(writer.output_schema)
+        self._kinds = column_kinds(writer)
+        self._buffers = []
+        # int column index -> missing-value mask (1 = NA)
+        self._masks: Dict[int, bytearray] = {}
+        for i, kind in enumerate(self._kinds):
+            if kind is int:
+                self._buffers.append(array("q"))
+                self._masks[i] = bytearray()
+            elif kind is float:
+                self._buffers.append(array("d"))
+            else:
+                self._buffers.append([])
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _convert(self, row: Dict) -> List:
+        values = []
+        for column, kind in zip(self.columns, self._kinds):
+            value = row.get(column)
+            if value is not None and pd.isna(value):
+                value = None
+            if value is not None:
+                if kind is int:
+                    value = int(value)
+                elif kind is float:
+                    value = float(value)
+            values.append(value)
+        return values
+
+    def append_row(self, row: Dict):
+        """Append a parser row dict (numbers still as text) to the buffers."""
+        # convert the whole row first, so a bad value leaves the buffers aligned
+        values = self._convert(row)
+        for i, (kind, buffer, value) in enumerate(
+            zip(self._kinds, self._buffers, values)
+        ):
+            if kind is int:
+                self._masks[i].append(value is None)
+                value = 0 if value is None else value
+            elif kind is float and value is None:
+                value = float("nan")
+            buffer.append(value)
+        self._length += 1
+
+    def extend_rows(self, rows: List[Dict]):
+        for row in rows:
+            self.append_row(row)
+
+    def to_dataframe(self, n: Optional[int] = None) -> pd.DataFrame:
+        """The first n (default: all) rows as a typed DataFrame in output_schema order."""
+        stop = self._length if n is None else min(n, self._length)
+        data = {}
+        for i, (column, kind, buffer) in enumerate(
+            zip(self.columns, self._kinds, self._buffers)
+        ):
+            if kind is int:
+                # copy: a live view would stop the array from growing
+                values = np.frombuffer(buffer, dtype=np.int64, count=stop).copy()
+                mask = np.frombuffer(self._masks[i], dtype=np.bool_, count=stop)
+                data[column] = pd.arrays.IntegerArray(values, mask.copy())
+            elif kind is float:
+                data[column] = np.frombuffer(
+                    buffer, dtype=np.float64, count=stop
+                ).copy()
+            elif kind is datetime:
+                data[column] = np.array(buffer[:stop], dtype="datetime64[ns]")
+            else:
+                data[column] = np.array(buffer[:stop], dtype=object)
+        return pd.DataFrame(data, columns=self.columns)
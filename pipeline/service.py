@@ -0,0 +1,330 @@
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+from pipeline.archive import (
+    DEFAULT_MAX_MEMBER_MB,
+    count_archive_pdfs,
+    is_archive,
+    iter_archive_pdfs,
+    member_limit_bytes,
+)
+from pipeline.cache import ExtractionCache
+from pipeline.memo import MemoCache
+
+# Backpressure limits of the batch service: jobs and PDF/archive bytes that
+# may be queued or running at once
+DEFAULT_MAX_QUEUED_JOBS = int(os.environ.get("PDF2EXCEL_MAX_QUEUED_JOBS", "16"))
+DEFAULT_MAX_QUEUED_MB = float(os.environ.get("PDF2EXCEL_MAX_QUEUED_MB", "512"))
+# finished jobs whose workbooks are kept for download, and their total size;
+# the oldest are dropped first
+DEFAULT_KEEP_FINISHED_JOBS = int(os.environ.get("PDF2EXCEL_KEEP_FINISHED_JOBS", "32"))
+DEFAULT_MAX_RETAINED_MB = float(os.environ.get("PDF2EXCEL_MAX_RETAINED_MB", "256"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = (
+    "queued",
+    "running",
+    "done",
+    "failed",
+    "cancelled",
+)
+
+
+class QueueFull(Exception):
+    """The job doesn't fit in the queue right now, the client should retry later."""
+
+
+class JobTooLarge(QueueFull):
+    """The job is larger than the whole queue and will never fit."""
+
+
+class ServiceJob:
+    """
+    One submitted PDF or archive of PDFs and, once it has run, its reports
+    serialized in `fmt` (one per order type, more than one only in auto mode).
+    The payload is dropped as soon as the job has run.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        payload: bytes,
+        mode: str,
+        fmt: str,
+        extractor: Optional[str] = None,
+        early_stop: bool = False,
+    ):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.mode = mode
+        self.fmt = fmt
+        self.extractor = extractor
+        self.early_stop = early_stop
+        self.size = len(payload)
+        self.payload: Optional[bytes] = payload
+        self.state = QUEUED
+        self.error: Optional[str] = None
+        self.outputs: Dict[str, bytes] = {}
+        self.rows: Dict[str, int] = {}
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        # the running BatchJob, for progress and cancellation
+        self.batch = None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def finished_state(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    @property
+    def output_bytes(self) -> int:
+        return sum(len(data) for data in self.outputs.values())
+
+    def files(self, max_member_bytes: Optional[int] = None):
+        if is_archive(self.name):
+            return iter_archive_pdfs(
+                io.BytesIO(self.payload), self.name, max_member_bytes
+            )
+        return iter([(self.name, self.payload)])
+
+    def total(self) -> Optional[int]:
+        if is_archive(self.name):
+            return count_archive_pdfs(io.BytesIO(self.payload), self.name)
+        return 1
+
+    def status(self) -> Dict:
+        status = {
+            "id": self.id,
+            "name": self.name,
+            "mode": self.mode,
+            "format": self.fmt,
+            "state": self.state,
+            "bytes": self.size,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+        }
+        batch = self.batch
+        if batch is not None:
+            status["progress"] = batch.progress()
+            if self.finished_state:
+                status.update(
+                    **batch.collector.file_info, failures=batch.collector.failures
+                )
+        if self.outputs:
+            status["outputs"] = {
+                mode: {"rows": self.rows[mode], "bytes": len(data)}
+                for mode, data in self.outputs.items()
+            }
+        return status
+
+
+class JobQueue:
+    """
+    Bounded queue of ServiceJobs run by `runners` background threads.
+    Each job runs as a BatchJob on the shared executor (a pre-warmed
+    WorkerPool, or a pool per job when None), memo and extraction cache, so
+    repeated submissions of the same PDFs are not parsed twice.
+    reserve() admits a job only while the queued and running jobs stay
+    within max_jobs and their payloads within max_mb; callers reserve before
+    reading a request body, so a burst of uploads is turned away instead of
+    being buffered in memory. Archive members are inflated one at a time and
+    only up to max_member_mb each. Reports of finished jobs are kept while
+    there are at most keep_finished of them and they total at most
+    max_retained_mb.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = DEFAULT_MAX_QUEUED_JOBS,
+        max_mb: float = DEFAULT_MAX_QUEUED_MB,
+        runners: int = 1,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        memo: Optional[MemoCache] = None,
+        cache: Optional[ExtractionCache] = None,
+        memory_limit_mb: Optional[float] = None,
+        keep_finished: int = DEFAULT_KEEP_FINISHED_JOBS,
+        max_member_mb: float = DEFAULT_MAX_MEMBER_MB,
+        max_retained_mb: float = DEFAULT_MAX_RETAINED_MB,
+    ):
+        self.max_jobs = max_jobs
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.keep_finished = keep_finished
+        self.max_member_bytes = member_limit_bytes(max_member_mb)
+        self.max_retained_bytes = int(max_retained_mb * 1024 * 1024)
+        self.retained_bytes = 0
+        self.queued_jobs = 0
+        self.queued_bytes = 0
+        self._max_workers = max_workers
+        self._executor = executor
+        self._memo = memo
+        self._cache = cache
+        self._memory_limit_mb = memory_limit_mb
+        self._jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        self._finished: List[str] = []
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[ServiceJob]]" = queue.Queue()
+        self._runners = [
+            threading.Thread(target=self._run, daemon=True) for _ in range(runners)
+        ]
+        for runner in self._runners:
+            runner.start()
+
+    def reserve(self, size: int):
+        """Claim a job slot and size bytes, raises QueueFull if they are not free."""
+        if size > self.max_bytes:
+            raise JobTooLarge(
+                f"Job of {size} bytes exceeds the queue limit of {self.max_bytes} bytes"
+            )
+        with self._lock:
+            if self.queued_jobs >= self.max_jobs:
+                raise QueueFull(f"{self.queued_jobs} jobs already queued")
+            if self.queued_bytes + size > self.max_bytes:
+                raise QueueFull(f"{self.queued_bytes} bytes already queued")
+            self.queued_jobs += 1
+            self.queued_bytes += size
+
+    def release(self, size: int):
+        with self._lock:
+            self.queued_jobs -= 1
+            self.queued_bytes -= size
+
+    def submit(self, job: ServiceJob) -> ServiceJob:
+        """Queue a job whose size was reserved."""
+        with self._lock:
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ServiceJob]:
+        """Cancel a queued or running job; a finished one is dropped with its reports."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.finished_state:
+                del self._jobs[job_id]
+                if job_id in self._finished:
+                    self._finished.remove(job_id)
+                    self.retained_bytes -= job.output_bytes
+                return job
+            job.cancel_requested.set()
+            batch = job.batch
+        if batch is not None:
+            batch.cancel()
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {
+                "jobs": states,
+                "queued_jobs": self.queued_jobs,
+                "max_jobs": self.max_jobs,
+                "queued_bytes": self.queued_bytes,
+                "max_bytes": self.max_bytes,
+                "retained_bytes": self.retained_bytes,
+                "max_retained_bytes": self.max_retained_bytes,
+            }
+
+    def shutdown(self):
+        for _ in self._runners:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run_job(job)
+            except Exception as e:
+                job.state, job.error = FAILED, str(e)
+            finally:
+                job.payload = None
+                job.finished = time.time()
+                self.release(job.size)
+                self._retire(job)
+
+    def _run_job(self, job: ServiceJob):
+        # imported here so importing the service stays light (see pool.warm_up)
+        from pipeline.ingest import create_excel_writer
+        from pipeline.job import BatchJob
+
+        if job.cancel_requested.is_set():
+            job.state = CANCELLED
+            return
+        job.state, job.started = RUNNING, time.time()
+        batch = BatchJob(
+            job.files(self.max_member_bytes),
+            job.mode,
+            total=job.total(),
+            max_workers=self._max_workers,
+            cache=self._cache,
+            memory_limit_mb=self._memory_limit_mb,
+            extractor=job.extractor,
+            early_stop=job.early_stop,
+            memo=self._memo,
+            executor=self._executor,
+        )
+        with self._lock:
+            job.batch = batch
+            cancelled = job.cancel_requested.is_set()
+        if cancelled:
+            job.state = CANCELLED
+            return
+        batch.start()
+        batch.wait()
+        if batch.cancelled:
+            job.state = CANCELLED
+            return
+        if batch.error:
+            job.state, job.error = FAILED, batch.error
+            return
+
+        reports = batch.collector.to_dataframes()
+        if not reports:
+            job.state = FAILED
+            job.error = (
+                "Can not successfully parse ANY PDF files, no report was generated."
+            )
+            return
+        for report_mode, df in reports.items():
+            writer = create_excel_writer(report_mode)
+            job.outputs[report_mode] = writer.write_output(df, job.fmt)
+            job.rows[report_mode] = len(df)
+        if job.output_bytes > self.max_retained_bytes:
+            size = job.output_bytes
+            job.outputs, job.rows = {}, {}
+            job.state = FAILED
+            job.error = f"Reports of {size} bytes exceed the retained limit of {self.max_retained_bytes} bytes"
+            return
+        job.state = DONE
+
+    def _retire(self, job: ServiceJob):
+        with self._lock:
+            if job.id not in self._jobs:
+                return
+            self._finished.append(job.id)
+            self.retained_bytes += job.output_bytes
+            while len(self._finished) > self.keep_finished or (
+                self.retained_bytes > self.max_retained_bytes
+            ):
+                dropped = self._jobs.pop(self._finished.pop(0), None)
+                if dropped is not None:
+                    self.retained_bytes -= dropped.output_bytes
@@ -0,0 +1,52 @@
+import os
+import threading
+from time import perf_counter
+from typing import Dict, Optional
+
+_IMPORTED_AT = perf_counter()
+
+
+def _proc_uptime() -> Optional[float]:
+    """Seconds since this process was started, from /proc (Linux only)."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # the command name may contain spaces, fields are counted after it
+            fields = f.read().rsplit(b")", 1)[1].split()
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - started, 0.0)
+
+
+_UPTIME_AT_IMPORT = _proc_uptime()
+
+
+def process_uptime() -> float:
+    """
+    Seconds since the process started; where /proc is missing, since this
+    module was first imported (which the app and CLI do right at startup).
+    """
+    elapsed = perf_counter() - _IMPORTED_AT
+    if _UPTIME_AT_IMPORT is None:
+        return elapsed
+    return _UPTIME_AT_IMPORT + elapsed
+
+
+class StartupMetrics:
+    """Seconds from process start to the first time each named event happened."""
+
+    def __init__(self):
+        self.events: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, event: str):
+        """Record `event` unless it was recorded before."""
+        with self._lock:
+            if event not in self.events:
+                self.events[event] = round(process_uptime(), 3)
+
+
+# one per process: cold start is a property of the process, not of a run
+STARTUP = StartupMetrics()
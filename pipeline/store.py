@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pipeline.archive import UnreadableFile
+from pipeline.cache import file_digest
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "PDF2EXCEL_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".pdf2excel", "records.sqlite3"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    mode TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    name TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    PRIMARY KEY (mode, digest)
+);
+CREATE TABLE IF NOT EXISTS records (
+    mode TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    revised INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (mode, record_key)
+);
+"""
+# PRAGMA user_version of the store; stores of version 0 held pickled rows
+# and are moved aside (never unpickled) rather than read
+_SCHEMA_VERSION = 1
+
+
+def _encode_row(row: Dict) -> str:
+    """Row as JSON, datetimes as {"$date": ISO string}."""
+
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$date": value.isoformat()}
+        raise TypeError(f"Can not store {type(value).__name__} value {value!r}")
+
+    return json.dumps(row, default=default)
+
+
+def _decode_row(data: str) -> Dict:
+    def object_hook(obj: Dict):
+        if obj.keys() == {"$date"}:
+            return datetime.fromisoformat(obj["$date"])
+        return obj
+
+    return json.loads(data, object_hook=object_hook)
+
+
+class RecordStore:
+    """
+    SQLite store of parsed rows, shared across runs.
+    Rows are keyed by the mode's id columns and remember the hash of the PDF
+    they came from and whether it was an original or a revised order.
+    A revised row replaces any earlier row with the same key, an original row
+    never replaces a revised one - the same rule the one-shot report applies.
+    Rows are stored as JSON, so opening a store file never runs code from it.
+    A store of an older version is renamed to <path>.v<version> and a new
+    one is started.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # used from the background job thread as well, so serialize access
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        version = self._old_version()
+        if version is not None:
+            self._conn.close()
+            os.replace(path, f"{path}.v{version}")
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _old_version(self) -> Optional[int]:
+        """user_version of an existing store older than _SCHEMA_VERSION, else None."""
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        has_records = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'records'"
+        ).fetchone()
+        if has_records and version < _SCHEMA_VERSION:
+            return version
+        return None
+
+    def close(self):
+        self._conn.close()
+
+    def has_file(self, mode: Optional[str], digest: str) -> bool:
+        """Whether the file was ingested in `mode` (None: in any mode)."""
+        with self._lock:
+            if mode is None:
+                row = self._conn.execute(
+                    "SELECT 1 FROM files WHERE digest = ?", (digest,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT 1 FROM files WHERE mode = ? AND digest = ?", (mode, digest)
+                ).fetchone()
+        return row is not None
+
+    def filter_new(
+        self,
+        files: Iterable[Tuple[str, bytes]],
+        mode: Optional[str],
+        skipped: List[str],
+    ) -> Iterator[Tuple[str, bytes]]:
+        """Yield files not ingested before in this mode (None: in any mode); names of known ones go to skipped."""
+        for name, data in files:
+            # unreadable members go on to be reported as failed
+            if not isinstance(data, UnreadableFile) and self.has_file(
+                mode, file_digest(data)
+            ):
+                skipped.append(name)
+            else:
+                yield name, data
+
+    def upsert(
+        self,
+        mode: str,
+        id_cols: List[str],
+        digest: str,
+        name: str,
+        file_type: str,
+        po_info: List[Dict],
+    ):
+        """Store the rows of one parsed file."""
+        revised = int(file_type == "revised")
+        with self._lock, self._conn:
+            for row in po_info:
+                record_key = json.dumps([row.get(col) for col in id_cols])
+                # delete + insert (rather than update) so the row moves to the
+                # end, like drop_duplicates(keep="last")
+                self._conn.execute(
+                    "DELETE FROM records WHERE mode = ? AND record_key = ? AND revised <= ?",
+                    (mode, record_key, revised),
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO records (mode, record_key, revised, digest, row) VALUES (?, ?, ?, ?, ?)",
+                    (mode, record_key, revised, digest, _encode_row(row)),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (mode, digest, name, file_type, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (mode, digest, name, file_type, datetime.now().isoformat()),
+            )
+
+    def rows(self, mode: str) -> List[Dict]:
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT row FROM records WHERE mode = ? ORDER BY rowid", (mode,)
+            )
+            return [_decode_row(row) for (row,) in cursor]
+
+    def to_dataframe(self, mode: str, sort_col: str) -> Optional["pd.DataFrame"]:
+        """All stored rows of a mode as a report DataFrame; None if the store is empty."""
+        from pipeline.ingest import create_excel_writer
+        from pipeline.records import ColumnarAccumulator
+
+        rows = ColumnarAccumulator(create_excel_writer(mode))
+        rows.extend_rows(self.rows(mode))
+        if not len(rows):
+            return None
+        return (
+            rows.to_dataframe()
+            .sort_values(sort_col, kind="stable")
+            .reset_index(drop=True)
+        )
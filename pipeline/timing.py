@@ -0,0 +1,49 @@
+import cProfile
+import io
+import marshal
+import pstats
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict
+
+
+class StageTimer:
+    """Accumulates wall time (seconds) per stage name."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - start
+
+
+class RunProfiler:
+    """cProfile wrapper whose result can be offered as a .prof download."""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def __enter__(self):
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._profile.disable()
+        return False
+
+    def to_bytes(self) -> bytes:
+        # same format as pstats.Stats.dump_stats, loadable with pstats/snakeviz
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+    def summary(self, limit: int = 25) -> str:
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(
+            limit
+        )
+        return out.getvalue()
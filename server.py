@@ -0,0 +1,359 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+from excel_writer.formats import OUTPUT_FORMATS
+from pipeline.archive import DEFAULT_MAX_MEMBER_MB, is_archive
+from pipeline.cache import ExtractionCache
+from pipeline.ingest import AUTO_MODE, EXTRACTORS, MODES, default_workers
+from pipeline.memo import MemoCache
+from pipeline.memory import DEFAULT_DOC_MEMORY_MB
+from pipeline.pool import WorkerPool
+from pipeline.service import (
+    DEFAULT_KEEP_FINISHED_JOBS,
+    DEFAULT_MAX_QUEUED_JOBS,
+    DEFAULT_MAX_QUEUED_MB,
+    DEFAULT_MAX_RETAINED_MB,
+    DONE,
+    JobQueue,
+    JobTooLarge,
+    QueueFull,
+    ServiceJob,
+)
+from pipeline.startup import STARTUP
+
+# seconds a client is asked to wait before resubmitting when the queue is full
+RETRY_AFTER = 5
+# bodies of rejected uploads up to this size are read and dropped so the client
+# gets the error response; larger ones just have the connection closed
+DISCARD_MAX_BYTES = 64 * 1024 * 1024
+
+
+class BatchRequestHandler(BaseHTTPRequestHandler):
+    """
+    Local batch API over a JobQueue (set as `job_queue` on the server):
+        POST   /jobs?mode=Retail&name=pos.zip   body: one PDF or a ZIP/TAR of PDFs
+               optional: format=xlsx|..., extractor=..., early_stop=1
+               -> 202 with the job status, 429 + Retry-After when the queue is full
+        GET    /jobs/<id>                       job status, progress and failures
+        GET    /jobs/<id>/result[?mode=Retail]  the report once the job is done
+        DELETE /jobs/<id>                       cancel the job or drop its reports
+        GET    /health                          queue usage
+    """
+
+    server_version = "pdf2excel"
+    # keep-alive and "Expect: 100-continue"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def job_queue(self) -> JobQueue:
+        return self.server.job_queue
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, message: str, **headers):
+        if not self._discard_body():
+            # the connection can't be reused with an unread body on it
+            headers["Connection"] = "close"
+        self.send_json(status, {"error": message}, headers)
+
+    def handle_expect_100(self):
+        # answered in do_POST once the job is admitted, so a rejected client
+        # doesn't send its upload at all
+        return True
+
+    def _expects_continue(self) -> bool:
+        return self.headers.get("Expect", "").lower() == "100-continue"
+
+    def _discard_body(self) -> bool:
+        """Read and drop an unread POST body, False if it is left unread."""
+        if self.command != "POST" or self.body_read:
+            return True
+        if self._expects_continue():
+            return False
+        try:
+            remaining = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            return False
+        if remaining > DISCARD_MAX_BYTES:
+            return False
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                return False
+            remaining -= len(chunk)
+        return True
+
+    def _route(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return parts, params
+
+    def _job(self, job_id: str) -> Optional[ServiceJob]:
+        job = self.job_queue.get(job_id)
+        if job is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        parts, params = self._route()
+        if parts == ["health"]:
+            self.send_json(HTTPStatus.OK, self.job_queue.stats())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job is not None:
+                self.send_json(HTTPStatus.OK, job.status())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            job = self._job(parts[1])
+            if job is not None:
+                self.send_result(job, params.get("mode"))
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No route {self.path}")
+
+    def send_result(self, job: ServiceJob, mode: Optional[str]):
+        if job.state != DONE:
+            self.send_error_json(
+                HTTPStatus.CONFLICT, f"Job {job.id} is {job.state}, not done"
+            )
+            return
+        if mode is None:
+            if len(job.outputs) > 1:
+                self.send_error_json(
+                    HTTPStatus.BAD_REQUEST,
+                    f"Job has one report per order type, pick one with ?mode= ({', '.join(job.outputs)})",
+                )
+                return
+            mode = next(iter(job.outputs))
+        data = job.outputs.get(mode)
+        if data is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"Job has no {mode} report")
+            return
+        fmt = OUTPUT_FORMATS[job.fmt]
+        file_name = f"{mode.lower()}_orders_{datetime.now().date().strftime('%Y%m%d')}.{fmt['extension']}"
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", fmt["mime"])
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(
+            "Content-Disposition", f"attachment; filename*=UTF-8''{quote(file_name)}"
+        )
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No route {self.path}")
+            return
+        job = self.job_queue.cancel(parts[1])
+        if job is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No job {parts[1]}")
+        else:
+            self.send_json(HTTPStatus.OK, job.status())
+
+    def do_POST(self):
+        self.body_read = False
+        parts, params = self._route()
+        if parts != ["jobs"]:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No route {self.path}")
+            return
+
+        mode = params.get("mode")
+        fmt = params.get("format", "xlsx")
+        name = params.get("name", "upload.pdf")
+        extractor = params.get("extractor")
+        if mode not in MODES + [AUTO_MODE]:
+            self.send_error_json(
+                HTTPStatus.BAD_REQUEST,
+                f"mode must be one of {', '.join(MODES + [AUTO_MODE])}",
+            )
+            return
+        if fmt not in OUTPUT_FORMATS:
+            self.send_error_json(
+                HTTPStatus.BAD_REQUEST,
+                f"format must be one of {', '.join(OUTPUT_FORMATS)}",
+            )
+            return
+        if extractor is not None and extractor not in EXTRACTORS:
+            self.send_error_json(
+                HTTPStatus.BAD_REQUEST,
+                f"extractor must be one of {', '.join(EXTRACTORS)}",
+            )
+            return
+        if not (name.lower().endswith(".pdf") or is_archive(name)):
+            self.send_error_json(
+                HTTPStatus.BAD_REQUEST, "name must end in .pdf or an archive suffix"
+            )
+            return
+        try:
+            size = int(self.headers.get("Content-Length", ""))
+            if size <= 0:
+                raise ValueError(size)
+        except ValueError:
+            self.send_error_json(
+                HTTPStatus.LENGTH_REQUIRED, "Content-Length is required"
+            )
+            return
+
+        # reserve before reading the body, so rejected uploads never reach memory
+        try:
+            self.job_queue.reserve(size)
+        except JobTooLarge as e:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(e))
+            return
+        except QueueFull as e:
+            self.send_error_json(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                f"Queue is full ({e}), retry later",
+                **{"Retry-After": str(RETRY_AFTER)},
+            )
+            return
+        if self._expects_continue():
+            self.send_response_only(HTTPStatus.CONTINUE)
+            self.end_headers()
+        try:
+            payload = self.rfile.read(size)
+        except OSError:
+            self.job_queue.release(size)
+            raise
+        self.body_read = True
+        if len(payload) != size:
+            self.job_queue.release(size)
+            self.send_error_json(HTTPStatus.BAD_REQUEST, "Incomplete request body")
+            return
+
+        job = ServiceJob(
+            name,
+            payload,
+            mode,
+            fmt,
+            extractor=extractor,
+            early_stop=params.get("early_stop", "0").lower() in ("1", "true", "yes"),
+        )
+        self.job_queue.submit(job)
+        self.send_json(
+            HTTPStatus.ACCEPTED, job.status(), {"Location": f"/jobs/{job.id}"}
+        )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serve a local HTTP API that parses submitted purchase order PDFs in the background."
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="interface to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument("--port", type=int, default=8502, help="port (default: 8502)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="worker processes, started and warmed up with the server (default: CPU count)",
+    )
+    parser.add_argument(
+        "--runners",
+        type=int,
+        default=1,
+        help="jobs run at the same time, all sharing the worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--max-queued-jobs",
+        type=int,
+        default=DEFAULT_MAX_QUEUED_JOBS,
+        help=f"queued and running jobs before new ones get 429 (default: {DEFAULT_MAX_QUEUED_JOBS})",
+    )
+    parser.add_argument(
+        "--max-queued-mb",
+        type=float,
+        default=DEFAULT_MAX_QUEUED_MB,
+        help=f"upload MB held by queued and running jobs before new ones get 429 (default: {DEFAULT_MAX_QUEUED_MB:g})",
+    )
+    parser.add_argument(
+        "--keep-finished",
+        type=int,
+        default=DEFAULT_KEEP_FINISHED_JOBS,
+        help=f"finished jobs whose reports stay downloadable (default: {DEFAULT_KEEP_FINISHED_JOBS})",
+    )
+    parser.add_argument(
+        "--max-retained-mb",
+        type=float,
+        default=DEFAULT_MAX_RETAINED_MB,
+        help=f"total MB of downloadable reports, the oldest are dropped beyond it (default: {DEFAULT_MAX_RETAINED_MB:g})",
+    )
+    parser.add_argument(
+        "--max-member-mb",
+        type=float,
+        default=DEFAULT_MAX_MEMBER_MB,
+        help=f"uncompressed MB of one PDF in an uploaded archive, larger ones fail (default: {DEFAULT_MAX_MEMBER_MB:g})",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_DOC_MEMORY_MB,
+        help="skip documents whose extraction grows memory past this many MB (default: 0 = off)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="disable the extraction cache"
+    )
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.runners < 1 or args.max_queued_jobs < 1:
+        parser.error("--workers, --runners and --max-queued-jobs must be at least 1")
+
+    pool = WorkerPool(args.workers)
+    job_queue = JobQueue(
+        max_jobs=args.max_queued_jobs,
+        max_mb=args.max_queued_mb,
+        runners=args.runners,
+        max_workers=args.workers,
+        executor=pool.executor,
+        memo=MemoCache(),
+        cache=None if args.no_cache else ExtractionCache(),
+        memory_limit_mb=args.memory_limit_mb or None,
+        keep_finished=args.keep_finished,
+        max_member_mb=args.max_member_mb,
+        max_retained_mb=args.max_retained_mb,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), BatchRequestHandler)
+    server.daemon_threads = True
+    server.job_queue = job_queue
+    server.quiet = args.quiet
+    STARTUP.mark("server listening")
+    print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        job_queue.shutdown()
+        pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
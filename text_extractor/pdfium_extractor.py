@@ -0,0 +1,84 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pipeline.memory import MemoryGuard
+from text_extractor.template import TextExtractor
+
+# same defaults as pdfplumber's extract_words
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+
+class PdfiumExtractor(TextExtractor):
+    """
+    Faster backend on PDFium's text layer (pypdfium2, installed with pdfplumber).
+    Skips pdfminer's layout analysis entirely; lines come out in PDFium's
+    reading order, which matches pdfplumber on the single-column PO layout.
+    """
+
+    @property
+    def name(self) -> str:
+        return "pdfium"
+
+    @property
+    def version(self) -> str:
+        import pypdfium2
+
+        return f"{pypdfium2.PYPDFIUM_INFO}-{pypdfium2.PDFIUM_INFO}"
+
+    def iter_pages(
+        self, source, mode: str, memory_guard: Optional[MemoryGuard] = None
+    ) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            for page_number in range(len(pdf)):
+                page = pdf[page_number]
+                textpage = page.get_textpage()
+                text = self.normalize(textpage.get_text_range())
+                words = None
+                if page_number == 0 and mode == "Retail":
+                    words = self.page_words(textpage, page.get_height())
+                textpage.close()
+                page.close()
+                if memory_guard is not None:
+                    memory_guard.check(f"after page {page_number + 1}")
+                yield text, words
+        finally:
+            pdf.close()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.strip() for line in lines).strip("\n")
+
+    @staticmethod
+    def page_words(textpage, page_height: float) -> List[Dict]:
+        """Group PDFium chars into pdfplumber-style words (split on spaces and gaps)."""
+        words = []
+        current = None
+        for i in range(textpage.count_chars()):
+            char = textpage.get_text_range(i, 1)
+            if not char or char.isspace():
+                current = None
+                continue
+            left, bottom, right, top = textpage.get_charbox(i, loose=True)
+            top, bottom = page_height - top, page_height - bottom
+            if (
+                current is not None
+                and left - current["x1"] <= X_TOLERANCE
+                and abs(top - current["top"]) <= Y_TOLERANCE
+            ):
+                current["text"] += char
+                current["x1"] = max(current["x1"], right)
+                current["bottom"] = max(current["bottom"], bottom)
+                continue
+            current = {
+                "text": char,
+                "x0": left,
+                "x1": right,
+                "top": top,
+                "bottom": bottom,
+            }
+            words.append(current)
+        return words
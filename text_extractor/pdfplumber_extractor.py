@@ -0,0 +1,52 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pdfplumber
+from pdfplumber.utils.text import WordExtractor
+
+from pipeline.memory import MemoryGuard
+from text_extractor.template import TextExtractor
+
+
+def page_text_and_words(page) -> Tuple[str, List[Dict]]:
+    """
+    Words and line text of a page from a single word-clustering pass,
+    equal to page.extract_words() and page.extract_text() with default settings.
+    """
+    wordmap = WordExtractor().extract_wordmap(page.chars)
+    textmap = wordmap.to_textmap(
+        presorted=True,
+        layout_bbox=page.bbox,
+        layout_width=page.width,
+        layout_height=page.height,
+    )
+    return textmap.as_string, [word for word, _ in wordmap.tuples]
+
+
+class PdfplumberExtractor(TextExtractor):
+    """Reference backend: pdfplumber layout analysis, as the parsers were written against."""
+
+    @property
+    def name(self) -> str:
+        return "pdfplumber"
+
+    @property
+    def version(self) -> str:
+        return pdfplumber.__version__
+
+    def iter_pages(
+        self, source, mode: str, memory_guard: Optional[MemoryGuard] = None
+    ) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        # pdfplumber's cached chars/layout of a page are released as soon as
+        # it is done, so memory doesn't grow with the page count
+        with pdfplumber.open(source) as pdf:
+            for page_number, page in enumerate(pdf.pages, 1):
+                words = None
+                if page_number == 1 and mode == "Retail":
+                    # Retail also needs page 0's word boxes for the Ship-To lookup
+                    text, words = page_text_and_words(page)
+                else:
+                    text = page.extract_text()
+                if memory_guard is not None:
+                    memory_guard.check(f"after page {page_number}")
+                page.close()
+                yield text, words
@@ -0,0 +1,45 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pipeline.memory import MemoryGuard
+
+
+class TextExtractor:
+    """
+    Turns a PDF into what the parsers consume:
+    (full_text, page-0 words for Retail, page count).
+    Words are dicts with at least 'text', 'x0', 'x1', 'top' and 'bottom'
+    in pdfplumber's coordinate system (origin at the top-left of the page).
+    """
+
+    @property
+    def name(self) -> str:
+        raise NotImplementedError("Subclasses should implement this method")
+
+    @property
+    def version(self) -> str:
+        # part of the extraction cache key
+        raise NotImplementedError("Subclasses should implement this method")
+
+    def iter_pages(
+        self, source, mode: str, memory_guard: Optional[MemoryGuard] = None
+    ) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        """
+        Yield (text, words) per page; words only for page 0 of Retail, else None.
+        Closing the generator early skips the remaining pages.
+        """
+        raise NotImplementedError("Subclasses should implement this method")
+
+    def extract(
+        self, source, mode: str, memory_guard: Optional[MemoryGuard] = None
+    ) -> Tuple[str, Optional[List[Dict]], int]:
+        texts = []
+        words = None
+        for text, page_words in self.iter_pages(source, mode, memory_guard):
+            texts.append(text)
+            if page_words is not None:
+                words = page_words
+        return self.join_pages(texts), words, len(texts)
+
+    @staticmethod
+    def join_pages(texts: List[str]) -> str:
+        return "".join(text + "\n" for text in texts if text)